@@ -19,7 +19,8 @@ from typing import List, Optional
 
 import pytz
 
-from market_maker_stats.util import Price, amount_to_size, timestamp_to_x, amount_in_usd_to_size, OrderHistoryItem
+from market_maker_stats.util import Price, amount_to_size, timestamp_to_x, timestamps_to_x, amount_in_usd_to_size, \
+    OrderHistoryItem
 
 
 def initialize_charting(output: Optional[str]):
@@ -78,7 +79,7 @@ def draw_chart(start_timestamp: int,
     ax.set_xlim(left=timestamp_to_x(start_timestamp), right=timestamp_to_x(end_timestamp))
     ax.xaxis.set_major_formatter(md.DateFormatter('%d-%b %H:%M', tz=pytz.UTC))
 
-    timestamps = list(map(timestamp_to_x, map(lambda item: item.timestamp, order_history)))
+    timestamps = timestamps_to_x([item.timestamp for item in order_history])
     closest_sell_prices = list(map(lambda item: item.closest_sell_price(), order_history))
     closest_buy_prices = list(map(lambda item: item.closest_buy_price(), order_history))
 
@@ -99,7 +100,7 @@ def draw_prices(prices, alternative_prices, price_gap_size):
 
     if len(prices) > 0:
         prices = prepare_prices_for_charting(prices, price_gap_size)
-        timestamps = list(map(lambda price: timestamp_to_x(price.timestamp), prices))
+        timestamps = timestamps_to_x([price.timestamp for price in prices])
         buy_prices = list(map(lambda price: price.buy_price if price.buy_price is not None else price.price, prices))
         sell_prices = list(map(lambda price: price.sell_price if price.sell_price is not None else price.price, prices))
 
@@ -108,7 +109,7 @@ def draw_prices(prices, alternative_prices, price_gap_size):
 
     if len(alternative_prices) > 0:
         alternative_prices = prepare_prices_for_charting(alternative_prices, price_gap_size)
-        timestamps = list(map(lambda price: timestamp_to_x(price.timestamp), alternative_prices))
+        timestamps = timestamps_to_x([price.timestamp for price in alternative_prices])
         buy_prices = list(map(lambda price: price.buy_price if price.buy_price is not None else price.price, alternative_prices))
         sell_prices = list(map(lambda price: price.sell_price if price.sell_price is not None else price.price, alternative_prices))
 
@@ -119,9 +120,6 @@ def draw_prices(prices, alternative_prices, price_gap_size):
 def draw_trades(our_trades, all_trades):
     import matplotlib.pyplot as plt
 
-    def to_timestamp(price_or_trade):
-        return timestamp_to_x(price_or_trade.timestamp)
-
     def to_price(trade):
         return trade.price
 
@@ -132,18 +130,18 @@ def draw_trades(our_trades, all_trades):
             return amount_in_usd_to_size(trade.money)
 
     sell_trades = list(filter(lambda trade: trade.is_sell is True, our_trades))
-    sell_x = list(map(to_timestamp, sell_trades))
+    sell_x = timestamps_to_x([trade.timestamp for trade in sell_trades])
     sell_y = list(map(to_price, sell_trades))
     sell_s = list(map(to_size, sell_trades))
     plt.scatter(x=sell_x, y=sell_y, s=sell_s, c='blue', zorder=4)
 
     buy_trades = list(filter(lambda trade: trade.is_sell is False, our_trades))
-    buy_x = list(map(to_timestamp, buy_trades))
+    buy_x = timestamps_to_x([trade.timestamp for trade in buy_trades])
     buy_y = list(map(to_price, buy_trades))
     buy_s = list(map(to_size, buy_trades))
     plt.scatter(x=buy_x, y=buy_y, s=buy_s, c='green', zorder=4)
 
-    all_x = list(map(to_timestamp, all_trades))
+    all_x = timestamps_to_x([trade.timestamp for trade in all_trades])
     all_y = list(map(to_price, all_trades))
     all_s = list(map(to_size, all_trades))
     plt.scatter(x=all_x, y=all_y, s=all_s, c='#ff00e5', zorder=3)
@@ -15,17 +15,20 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from operator import attrgetter
 from typing import List
 
 from web3 import Web3
 
-from market_maker_stats.util import get_event_timestamp
+from market_maker_stats.util import get_event_timestamp, prefetch_event_timestamps
 from pymaker import Address
 from pymaker.etherdelta import LogTrade
 from pymaker.numeric import Wad
 
 
 class Trade:
+    __slots__ = ('timestamp', 'price', 'amount', 'money', 'is_sell', 'taker')
+
     def __init__(self, timestamp: int, price: Wad, amount: Wad, money: Wad, is_sell: bool, taker: Address):
         self.timestamp = timestamp
         self.price = price
@@ -42,13 +45,23 @@ def etherdelta_trades(infura: Web3, market_maker_address: Address, sai_address:
     assert(isinstance(eth_address, Address))
     assert(isinstance(past_trades, list))
 
-    def sell_trades() -> List[Trade]:
-        return list(map(lambda log_trade: Trade(get_event_timestamp(infura, log_trade), log_trade.give_amount / log_trade.take_amount, log_trade.take_amount, log_trade.give_amount, True, log_trade.taker),
-                    filter(lambda log_trade: log_trade.maker == market_maker_address and log_trade.buy_token == sai_address and log_trade.pay_token == eth_address, past_trades)))
+    sell_log_trades = []
+    buy_log_trades = []
+    for log_trade in past_trades:
+        if log_trade.maker != market_maker_address:
+            continue
+
+        if log_trade.buy_token == sai_address and log_trade.pay_token == eth_address:
+            sell_log_trades.append(log_trade)
+        elif log_trade.buy_token == eth_address and log_trade.pay_token == sai_address:
+            buy_log_trades.append(log_trade)
+
+    prefetch_event_timestamps(infura, sell_log_trades + buy_log_trades)
 
-    def buy_trades() -> List[Trade]:
-        return list(map(lambda log_trade: Trade(get_event_timestamp(infura, log_trade), log_trade.take_amount / log_trade.give_amount, log_trade.give_amount, log_trade.take_amount, False, log_trade.taker),
-                    filter(lambda log_trade: log_trade.maker == market_maker_address and log_trade.buy_token == eth_address and log_trade.pay_token == sai_address, past_trades)))
+    sell_trades = [Trade(get_event_timestamp(infura, log_trade), log_trade.give_amount / log_trade.take_amount, log_trade.take_amount, log_trade.give_amount, True, log_trade.taker)
+                   for log_trade in sell_log_trades]
+    buy_trades = [Trade(get_event_timestamp(infura, log_trade), log_trade.take_amount / log_trade.give_amount, log_trade.give_amount, log_trade.take_amount, False, log_trade.taker)
+                  for log_trade in buy_log_trades]
 
-    trades = sell_trades() + buy_trades()
-    return sorted(trades, key=lambda trade: trade.timestamp)
+    trades = sell_trades + buy_trades
+    return sorted(trades, key=attrgetter('timestamp'))
@@ -24,7 +24,7 @@ from web3 import Web3, HTTPProvider
 
 from market_maker_stats.etherdelta import etherdelta_trades
 from market_maker_stats.pnl import get_approx_vwaps, pnl_text, pnl_chart
-from market_maker_stats.util import sort_trades_for_pnl, get_gdax_prices, get_block_timestamp, get_prices
+from market_maker_stats.util import sort_trades_for_pnl, to_float_trades, get_gdax_prices, get_block_timestamp, get_price_arrays
 from pymaker import Address
 from pymaker.etherdelta import EtherDelta
 
@@ -77,11 +77,11 @@ class EtherDeltaMarketMakerPnl:
 
         events = self.etherdelta.past_trade(self.arguments.past_blocks, {'get': self.market_maker_address.address})
         trades = etherdelta_trades(self.infura, self.market_maker_address, self.sai_address, self.eth_address, events)
-        trades = sort_trades_for_pnl(trades)
+        trades = to_float_trades(sort_trades_for_pnl(trades))
 
-        prices = get_prices(self.arguments.gdax_price, self.arguments.price_feed, self.arguments.price_history_file, start_timestamp, end_timestamp)
+        prices = get_price_arrays(self.arguments.gdax_price, self.arguments.price_feed, self.arguments.price_history_file, start_timestamp, end_timestamp)
         vwaps = get_approx_vwaps(prices, self.arguments.vwap_minutes)
-        vwaps_start = prices[0].timestamp
+        vwaps_start = int(prices.timestamp[0])
 
         if self.arguments.text:
             pnl_text(trades, vwaps, vwaps_start, self.arguments.buy_token, self.arguments.sell_token, self.arguments.vwap_minutes, self.arguments.output)
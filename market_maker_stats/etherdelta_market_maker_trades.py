@@ -16,19 +16,14 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import argparse
-import datetime
-import json
 import logging
 import sys
-from typing import List
 
-import pytz
-from texttable import Texttable
 from web3 import Web3, HTTPProvider
 
 from market_maker_stats.etherdelta import etherdelta_trades, Trade
 from market_maker_stats.trades import text_trades, json_trades
-from market_maker_stats.util import format_timestamp, sort_trades
+from market_maker_stats.util import sort_trades
 from pymaker import Address
 from pymaker.etherdelta import EtherDelta
 
@@ -20,7 +20,7 @@ import sys
 import time
 
 from market_maker_stats.pnl import get_approx_vwaps, pnl_text, pnl_chart
-from market_maker_stats.util import to_seconds, sort_trades_for_pnl, initialize_logging, get_prices, get_trades
+from market_maker_stats.util import to_seconds, sort_trades_for_pnl, to_float_trades, initialize_logging, get_price_arrays, get_trades
 
 
 class MarketMakerPnl:
@@ -54,10 +54,10 @@ class MarketMakerPnl:
         start_timestamp = int(time.time() - to_seconds(self.arguments.past))
         end_timestamp = int(time.time())
 
-        trades = sort_trades_for_pnl(get_trades(self.arguments.our_trades, start_timestamp, end_timestamp))
-        prices = get_prices(self.arguments.gdax_price, self.arguments.price_feed, self.arguments.price_history_file, start_timestamp, end_timestamp)
+        trades = to_float_trades(sort_trades_for_pnl(get_trades(self.arguments.our_trades, start_timestamp, end_timestamp)))
+        prices = get_price_arrays(self.arguments.gdax_price, self.arguments.price_feed, self.arguments.price_history_file, start_timestamp, end_timestamp)
         vwaps = get_approx_vwaps(prices, self.arguments.vwap_minutes)
-        vwaps_start = prices[0].timestamp
+        vwaps_start = int(prices.timestamp[0])
 
         if self.arguments.text:
             pnl_text(trades, vwaps, vwaps_start, self.arguments.buy_token, self.arguments.sell_token, self.arguments.vwap_minutes, self.arguments.output)
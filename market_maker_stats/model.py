@@ -20,6 +20,8 @@ from pymaker import Wad
 
 
 class AllTrade:
+    __slots__ = ('exchange', 'maker', 'pair', 'timestamp', 'is_sell', 'amount', 'amount_symbol', 'price', 'money', 'money_symbol')
+
     def __init__(self, exchange: str, maker: Optional[str], pair: str, timestamp: int, is_sell: Optional[bool], amount: Wad, price: Wad):
         assert(isinstance(exchange, str))
         assert(isinstance(maker, str) or (maker is None))
@@ -15,6 +15,7 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from operator import attrgetter
 from typing import List
 
 from market_maker_stats.model import AllTrade
@@ -24,6 +25,8 @@ from pymaker.oasis import LogTake
 
 
 class Trade:
+    __slots__ = ('exchange', 'maker', 'pair', 'timestamp', 'price', 'amount', 'money', 'is_sell', 'taker')
+
     def __init__(self, exchange: str, maker: str, pair: str, timestamp: int, price: Wad, amount: Wad, money: Wad, is_sell: bool, taker: Address):
         self.exchange = exchange
         self.maker = maker
@@ -57,7 +60,7 @@ def our_oasis_trades(market_maker_address: Address, buy_token_address: Address,
         return list(regular) + list(matched)
 
     trades = sell_trades() + buy_trades()
-    return sorted(trades, key=lambda trade: trade.timestamp)
+    return sorted(trades, key=attrgetter('timestamp'))
 
 
 def all_oasis_trades(buy_token_address: Address, sell_token_address: Address, past_takes: List[LogTake]) -> List[AllTrade]:
@@ -71,4 +74,4 @@ def all_oasis_trades(buy_token_address: Address, sell_token_address: Address, pa
     matched = map(lambda log_take: AllTrade('oasis', None, '-', int(log_take.timestamp), None, log_take.give_amount, log_take.take_amount / log_take.give_amount),
                   filter(lambda log_take: log_take.buy_token == sell_token_address and log_take.pay_token == buy_token_address, past_takes))
 
-    return sorted(list(regular) + list(matched), key=lambda trade: trade.timestamp)
+    return sorted(list(regular) + list(matched), key=attrgetter('timestamp'))
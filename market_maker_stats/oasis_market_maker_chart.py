@@ -19,6 +19,7 @@ import argparse
 import sys
 import time
 from functools import reduce
+from operator import attrgetter
 from typing import List, Optional
 
 from web3 import Web3, HTTPProvider
@@ -134,7 +135,7 @@ class OasisMarketMakerChart:
         event_timestamps = sorted(set(map(lambda event: event.timestamp, past_make + past_take + past_kill)))
         states_timestamps = self.tighten_timestamps(event_timestamps) + [end_timestamp]
         states = list(filter(lambda state: state.timestamp >= start_timestamp, reduce(reduce_func, states_timestamps, [])))
-        states = sorted(states, key=lambda state: state.timestamp)
+        states = sorted(states, key=attrgetter('timestamp'))
 
         prices = get_prices(self.arguments.gdax_price, self.arguments.price_feed, None, start_timestamp, end_timestamp)
         alternative_prices = get_prices(None, self.arguments.alternative_price_feed, None, start_timestamp, end_timestamp)
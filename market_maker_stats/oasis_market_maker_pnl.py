@@ -24,7 +24,7 @@ from web3 import Web3, HTTPProvider
 
 from market_maker_stats.oasis import our_oasis_trades
 from market_maker_stats.pnl import get_approx_vwaps, pnl_text, pnl_chart
-from market_maker_stats.util import get_gdax_prices, sort_trades_for_pnl, get_block_timestamp, get_prices
+from market_maker_stats.util import get_gdax_prices, sort_trades_for_pnl, to_float_trades, get_block_timestamp, get_price_arrays
 from pymaker import Address
 from pymaker.oasis import SimpleMarket
 
@@ -79,11 +79,11 @@ class OasisMarketMakerPnl:
 
         events = self.otc.past_take(self.arguments.past_blocks)
         trades = our_oasis_trades(self.market_maker_address, self.buy_token_address, self.sell_token_address, events, '-')
-        trades = sort_trades_for_pnl(trades)
+        trades = to_float_trades(sort_trades_for_pnl(trades))
 
-        prices = get_prices(self.arguments.gdax_price, self.arguments.price_feed, self.arguments.price_history_file, start_timestamp, end_timestamp)
+        prices = get_price_arrays(self.arguments.gdax_price, self.arguments.price_feed, self.arguments.price_history_file, start_timestamp, end_timestamp)
         vwaps = get_approx_vwaps(prices, self.arguments.vwap_minutes)
-        vwaps_start = prices[0].timestamp
+        vwaps_start = int(prices.timestamp[0])
 
         if self.arguments.text:
             pnl_text(trades, vwaps, vwaps_start, self.buy_token, self.sell_token, self.arguments.vwap_minutes, self.arguments.output)
@@ -17,20 +17,19 @@
 
 import datetime
 from itertools import groupby
+from operator import attrgetter
 
 import numpy as np
 import pytz
-from texttable import Texttable
-from typing import List, Optional
+from typing import Optional
 
-from market_maker_stats.util import get_day, sum_wads, Price, timestamp_to_x
-from pymaker import Wad
+# numba is an optional dependency, if it isn't installed rolling VWAPs get calculated with NumPy only
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 
-
-def rolling_window(a, window):
-    shape = a.shape[:-1] + (a.shape[-1] - window + 1, window)
-    strides = a.strides + (a.strides[-1],)
-    return np.lib.stride_tricks.as_strided(a, shape=shape, strides=strides)
+from market_maker_stats.util import get_day, Price, PriceArrays, timestamp_to_x, timestamps_to_x
 
 
 # prices can have gaps, but for PnL calculation we need minute-by-minute data, that's why we fill the gaps.
@@ -59,20 +58,93 @@ def granularize_prices(prices: list) -> list:
     return granular_prices
 
 
-def get_approx_vwaps(prices: list, vwap_minutes: int):
-    granular_prices = granularize_prices(prices)
+# same as `granularize_prices`, but operates on `PriceArrays` without building any intermediate objects
+def granularize_price_arrays(prices: PriceArrays) -> PriceArrays:
+    if len(prices) == 0:
+        return prices
+
+    minute_increments = np.diff(prices.timestamp // 60)
+    gaps = np.maximum(minute_increments - 1, 0)
+    keep = np.concatenate(([True], minute_increments > 0))
+
+    # each kept sample is preceded by the zero samples filling the gap before it
+    counts = keep.astype(np.int64) + np.concatenate(([0], gaps))
+    kept_positions = (np.cumsum(counts) - 1)[keep]
+    gap_positions = np.ones(np.sum(counts), dtype=bool)
+    gap_positions[kept_positions] = False
+
+    gap_steps = np.arange(np.sum(gaps)) - np.repeat(np.cumsum(gaps) - gaps, gaps) + 1
+    gap_timestamps = np.repeat(prices.timestamp[:-1], gaps) + 60*gap_steps
+
+    timestamp = np.empty(np.sum(counts), dtype=np.int64)
+    timestamp[kept_positions] = prices.timestamp[keep]
+    timestamp[gap_positions] = gap_timestamps
+    price = np.zeros(np.sum(counts), dtype=np.float64)
+    price[kept_positions] = prices.price[keep]
+    volume = np.zeros(np.sum(counts), dtype=np.float64)
+    volume[kept_positions] = prices.volume[keep]
+
+    return PriceArrays(timestamp=timestamp, price=price, volume=volume)
+
+
+def rolling_vwaps_numpy(prices: np.ndarray, volumes: np.ndarray, window: int) -> np.ndarray:
+    # rolling sums are calculated as differences of cumulative sums, so it's O(n) regardless of the window size
+    cumulative_weighted_prices = np.concatenate(([0.0], np.cumsum(prices * volumes)))
+    cumulative_volumes = np.concatenate(([0.0], np.cumsum(volumes)))
+
+    rolling_weighted_prices = cumulative_weighted_prices[window:] - cumulative_weighted_prices[:-window]
+    rolling_volumes = cumulative_volumes[window:] - cumulative_volumes[:-window]
+
+    return rolling_weighted_prices / rolling_volumes
+
+
+def rolling_vwaps_loop(prices: np.ndarray, volumes: np.ndarray, window: int) -> np.ndarray:
+    # single pass over the data with a sliding window, meant to be compiled with numba
+    result = np.empty(max(len(prices) - window + 1, 0))
+    sum_weighted_prices = 0.0
+    sum_volumes = 0.0
+    non_zero_volumes = 0
+
+    for i in range(len(prices)):
+        sum_weighted_prices += prices[i] * volumes[i]
+        sum_volumes += volumes[i]
+        if volumes[i] != 0.0:
+            non_zero_volumes += 1
+
+        if i >= window:
+            sum_weighted_prices -= prices[i - window] * volumes[i - window]
+            sum_volumes -= volumes[i - window]
+            if volumes[i - window] != 0.0:
+                non_zero_volumes -= 1
+
+        # sums do not always go back to exactly zero after subtracting, so we track empty windows
+        # separately in order to get `nan` for them, same as the NumPy implementation does
+        if i >= window - 1:
+            if non_zero_volumes > 0:
+                result[i - window + 1] = sum_weighted_prices / sum_volumes
+            else:
+                result[i - window + 1] = np.nan
+
+    return result
+
+
+if njit is not None:
+    rolling_vwaps_loop = njit(cache=True)(rolling_vwaps_loop)
+
+
+def get_approx_vwaps(prices: PriceArrays, vwap_minutes: int):
+    assert(isinstance(prices, PriceArrays))
+    assert(isinstance(vwap_minutes, int))
+
+    granular_prices = granularize_price_arrays(prices)
 
     # approximates historical vwap_minutes VWAPs from GDAX by querying historical at minimal
     # (60 second) granularity, using (low+high)/2 as price for each bucket, then weighting by volume
     # traded in each bucket. Might not be that accurate, consider applying smoothing on top of this
-    granular_prices_avg = np.array(list(map(lambda price: price.price, granular_prices)))
-    granular_volumes = np.array(list(map(lambda price: price.volume, granular_prices)))
-
-    rolling_volumes = rolling_window(granular_volumes, vwap_minutes)
-    rolling_prices = rolling_window(granular_prices_avg, vwap_minutes)
-    weighted_prices = rolling_prices * rolling_volumes
-
-    vwaps = np.sum(weighted_prices, axis=1) / np.sum(rolling_volumes, axis=1)
+    if njit is not None:
+        vwaps = rolling_vwaps_loop(granular_prices.price, granular_prices.volume, vwap_minutes)
+    else:
+        vwaps = rolling_vwaps_numpy(granular_prices.price, granular_prices.volume, vwap_minutes)
 
     return vwaps
 
@@ -85,12 +157,12 @@ def to_direction(x):
 
 
 def prepare_trades_for_pnl(trades: list):
-    trades = sorted(trades, key=lambda trade: trade.timestamp)
+    trades = sorted(trades, key=attrgetter('timestamp'))
 
     # assumes the pair is ETH/DAI or BTC/DAI, so buying is +ETH_or_BTC -DAI
     # trades is a 2-column array where each row is (delta_ETH_or_BTC, delta_DAI)
-    deals = np.array([(to_direction(not trade.is_sell)*float(trade.amount), to_direction(trade.is_sell)*float(trade.money)) for trade in trades])
-    prices = np.array([float(trade.price) for trade in trades])
+    deals = np.array([(to_direction(not trade.is_sell)*trade.amount, to_direction(trade.is_sell)*trade.money) for trade in trades])
+    prices = np.array([trade.price for trade in trades])
     timestamps = np.array([trade.timestamp for trade in trades])
 
     return deals, prices, timestamps
@@ -104,11 +176,9 @@ def calculate_pnl(pnl_trades, pnl_prices, pnl_timestamps, vwaps, vwaps_start):
     # put timestamps into (forward-looking) minute buckets starting at 0
     # this means we must exclude trades from the last vwap_minutes minutes
     rel_minutes = np.ceil((pnl_timestamps - vwaps_start) / 60).astype('int')
-    where_overshoot = np.where(rel_minutes >= len(vwaps))[0]
-    if where_overshoot.size == 0:
-        end = len(rel_minutes)
-    else:
-        end = where_overshoot[0]
+
+    # trades are sorted by timestamp, so we can binary search for the first one without a vwap
+    end = np.searchsorted(rel_minutes, len(vwaps), side='left')
 
     trade_market_vwaps = vwaps[rel_minutes[:end]]
     profits = (trade_market_vwaps - pnl_prices[:end]) * pnl_trades[:, 0][:end]
@@ -120,14 +190,16 @@ def calculate_pnl(pnl_trades, pnl_prices, pnl_timestamps, vwaps, vwaps_start):
 
 
 def pnl_text(trades: list, vwaps: list, vwaps_start: int, buy_token: str, sell_token: str, vwap_minutes: int, output: Optional[str]):
+    from texttable import Texttable
+
     if buy_token.upper() in ['DAI', 'USD', 'USDT']:
         amount_format = "{:,.2f} " + buy_token.upper()
     else:
         amount_format = "{:,.4f} " + buy_token.upper()
 
     data = []
-    total_volume = Wad(0)
-    total_net = Wad(0)
+    total_volume = 0.0
+    total_net = 0.0
     total_profit = 0
     for day, day_trades in groupby(trades, lambda trade: get_day(trade.timestamp)):
         day_trades = list(day_trades)
@@ -135,9 +207,9 @@ def pnl_text(trades: list, vwaps: list, vwaps_start: int, buy_token: str, sell_t
         pnl_trades, pnl_prices, pnl_timestamps = prepare_trades_for_pnl(day_trades)
         pnl_profits = calculate_pnl(pnl_trades, pnl_prices, pnl_timestamps, vwaps, vwaps_start)
 
-        day_volume = sum_wads(map(lambda trade: trade.money, day_trades))
-        day_bought = sum_wads(map(lambda trade: trade.money, filter(lambda trade: trade.is_sell, day_trades)))
-        day_sold = sum_wads(map(lambda trade: trade.money, filter(lambda trade: not trade.is_sell, day_trades)))
+        day_volume = sum(trade.money for trade in day_trades)
+        day_bought = sum(trade.money for trade in day_trades if trade.is_sell)
+        day_sold = sum(trade.money for trade in day_trades if not trade.is_sell)
         day_net = day_bought - day_sold
         day_profit = np.sum(pnl_profits)
 
@@ -147,11 +219,11 @@ def pnl_text(trades: list, vwaps: list, vwaps_start: int, buy_token: str, sell_t
 
         data.append([day.strftime('%Y-%m-%d'),
                      len(day_trades),
-                     amount_format.format(float(day_volume)),
-                     amount_format.format(float(day_bought)),
-                     amount_format.format(float(day_sold)),
-                     amount_format.format(float(day_net)),
-                     amount_format.format(float(total_net)),
+                     amount_format.format(day_volume),
+                     amount_format.format(day_bought),
+                     amount_format.format(day_sold),
+                     amount_format.format(day_net),
+                     amount_format.format(total_net),
                      amount_format.format(day_profit)])
 
     table = Texttable(max_width=250)
@@ -169,7 +241,7 @@ def pnl_text(trades: list, vwaps: list, vwaps_start: int, buy_token: str, sell_t
              f"The last window of {vwap_minutes} minutes of trades is excluded from profit calculation." + "\n" + \
              f"" + "\n" + \
              f"Total number of trades: {len(trades)}" + "\n" + \
-             f"Total volume: " + amount_format.format(float(total_volume)) + "\n" + \
+             f"Total volume: " + amount_format.format(total_volume) + "\n" + \
              f"Total profit: " + amount_format.format(total_profit) + "\n" + \
              f"" + "\n" + \
              f"Generated at: {datetime.datetime.now(tz=pytz.UTC).strftime('%Y.%m.%d %H:%M:%S %Z')}"
@@ -182,7 +254,7 @@ def pnl_text(trades: list, vwaps: list, vwaps_start: int, buy_token: str, sell_t
         print(result)
 
 
-def pnl_chart(start_timestamp: int, end_timestamp: int, prices: List[Price], trades: list, vwaps: list, vwaps_start: int, buy_token: str, sell_token: str, output: Optional[str]):
+def pnl_chart(start_timestamp: int, end_timestamp: int, prices: PriceArrays, trades: list, vwaps: list, vwaps_start: int, buy_token: str, sell_token: str, output: Optional[str]):
     import matplotlib.dates as md
     import matplotlib.pyplot as plt
 
@@ -202,8 +274,7 @@ def pnl_chart(start_timestamp: int, end_timestamp: int, prices: List[Price], tra
     dt_timestamps = [datetime.datetime.fromtimestamp(timestamp) for timestamp in pnl_timestamps]
     ax.plot(dt_timestamps[:len(pnl_profits)], np.cumsum(pnl_profits), color='green')
 
-    ax2.plot(list(map(lambda price: timestamp_to_x(price.timestamp), prices)),
-             list(map(lambda price: price.price, prices)), color='red')
+    ax2.plot(timestamps_to_x(prices.timestamp), prices.price, color='red')
 
     ax.set_ylabel(f"Cumulative PnL ({buy_token})")
     ax2.set_ylabel(f"{sell_token} price in {buy_token}")
@@ -17,10 +17,62 @@
 
 import json
 import datetime
+import re
+import sys
+from itertools import chain
 from typing import Optional
 
 import pytz
-from texttable import Texttable
+
+from market_maker_stats.util import format_timestamp
+
+
+# Tables with at least that many rows get laid out by `draw_table` itself instead of by `Texttable`.
+FAST_TABLE_MIN_ROWS = 500
+TABLE_MAX_WIDTH = 250
+
+# Printable ASCII only, as `Texttable` counts wide characters as two columns and splits cells on newlines.
+PLAIN_TEXT = re.compile('[ -~]*')
+
+
+def draw_table(header: list, rows: list, cols_align: list) -> str:
+    # `Texttable` measures and wraps every single cell, which gets slow for long trade histories. as long as
+    # nothing needs to be wrapped and all cells are plain text, we can lay out the table ourselves exactly
+    # the way `Texttable` does. it sizes columns including trailing whitespace, but then its wrapping drops
+    # that whitespace from the cells themselves, so we do the same
+    widths = [max(map(len, column)) for column in zip(header, *rows)]
+    if len(rows) < FAST_TABLE_MIN_ROWS \
+            or sum(widths) + 3 * (len(widths) - 1) > TABLE_MAX_WIDTH \
+            or not PLAIN_TEXT.fullmatch(''.join(chain(header, *rows))):
+        from texttable import Texttable
+
+        table = Texttable(max_width=TABLE_MAX_WIDTH)
+        table.set_deco(Texttable.HEADER)
+        table.set_cols_dtype(['t'] * len(header))
+        table.set_cols_align(cols_align)
+        table.add_rows([header] + rows)
+        return table.draw()
+
+    def center(cell: str, width: int) -> str:
+        fill = width - len(cell)
+        return ' ' * (fill // 2) + cell + ' ' * (fill - fill // 2)
+
+    header = [cell.rstrip() for cell in header]
+    rows = [[cell.rstrip() for cell in row] for row in rows]
+    justify = [str.rjust if align == 'r' else center if align == 'c' else str.ljust for align in cols_align]
+
+    lines = ['   '.join(center(cell, width) for cell, width in zip(header, widths)),
+             '==='.join('=' * width for width in widths)]
+    lines.extend('   '.join(just(cell, width) for cell, width, just in zip(row, widths, justify)) for row in rows)
+
+    return '\n'.join(lines)
+
+
+def json_item(item: dict) -> str:
+    # produces exactly what `json.dumps` with `indent=True` does for a flat dictionary nested in a list,
+    # but as indentation makes `json` fall back to its pure Python encoder, we emulate it with separators
+    # instead so the C encoder can be used. encoded strings never contain raw newlines, so it is safe
+    return ' {\n  ' + json.dumps(item, separators=(',\n  ', ': '))[1:-1] + '\n }'
 
 
 def json_trades(trades: list, output: Optional[str], include_taker: bool = False):
@@ -47,14 +99,21 @@ def json_trades(trades: list, output: Optional[str], include_taker: bool = False
 
         return item
 
-    result = json.dumps(list(map(build_item, trades)), indent=True)
+    # items get written one by one as they are built, so we never hold the whole document in memory
+    def write_result(file):
+        file.write('[')
+        for index, trade in enumerate(trades):
+            file.write(',\n' if index > 0 else '\n')
+            file.write(json_item(build_item(trade)))
+        file.write('\n]' if len(trades) > 0 else ']')
 
     if output is not None:
         with open(output, "w") as file:
-            file.write(result)
+            write_result(file)
 
     else:
-        print(result)
+        write_result(sys.stdout)
+        sys.stdout.write('\n')
 
 
 def text_trades(buy_token, sell_token, trades, output: Optional[str], include_taker: bool = False):
@@ -78,27 +137,25 @@ def text_trades(buy_token, sell_token, trades, output: Optional[str], include_ta
     def table_row(trade) -> list:
         return [format_timestamp(trade.timestamp),
                 trade.exchange,
-                trade.maker if trade.maker is not None else "n/a",
+                str(trade.maker) if trade.maker is not None else "n/a",
                 trade.pair,
                 "Sell" if trade.is_sell is True else "Buy" if trade.is_sell is False else "n/a",
                 format(float(trade.price), '.8f'),
                 ' '*5 + format(float(trade.amount), '.8f') + ' ' + amount_symbol(trade),
                 ' '*3 + format(float(trade.money), '.8f') + ' ' + money_symbol(trade)] + ([str(trade.taker)] if include_taker else [])
 
-    table = Texttable(max_width=250)
-    table.set_deco(Texttable.HEADER)
-    table.set_cols_dtype(['t', 't', 't', 't', 't', 't', 't', 't'] + (['t'] if include_taker else []))
-    table.set_cols_align(['l', 'l', 'l', 'l', 'l', 'r', 'r', 'r'] + (['l'] if include_taker else []))
-    table.add_rows([["Date/time",
-                     "Exchange",
-                     "Maker",
-                     "Pair",
-                     "Type",
-                     "Price",
-                     f"Amount",
-                     f"Value"] + (["Taker"] if include_taker else [])] + list(map(table_row, trades)))
-
-    result = table.draw() + "\n\n" + \
+    table = draw_table(["Date/time",
+                        "Exchange",
+                        "Maker",
+                        "Pair",
+                        "Type",
+                        "Price",
+                        f"Amount",
+                        f"Value"] + (["Taker"] if include_taker else []),
+                       list(map(table_row, trades)),
+                       ['l', 'l', 'l', 'l', 'l', 'r', 'r', 'r'] + (['l'] if include_taker else []))
+
+    result = table + "\n\n" + \
              f"Number of trades: {len(trades)}" + "\n" + \
              f"Generated at: {datetime.datetime.now(tz=pytz.UTC).strftime('%Y.%m.%d %H:%M:%S %Z')}"
 
@@ -108,8 +165,3 @@ def text_trades(buy_token, sell_token, trades, output: Optional[str], include_ta
 
     else:
         print(result)
-
-
-def format_timestamp(timestamp: int):
-    assert(isinstance(timestamp, int))
-    return datetime.datetime.fromtimestamp(timestamp, pytz.UTC).strftime('%Y-%m-%d %H:%M:%S %Z')
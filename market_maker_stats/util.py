@@ -15,26 +15,38 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import argparse
 import datetime
-import json
 import logging
+from collections import namedtuple
 
 import errno
-from functools import reduce
-from pprint import pformat
+import sqlite3
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from operator import attrgetter
 
 import filelock
 import pytz
 import re
 import requests
 import os
+import threading
 import time
 import numpy as np
 from typing import List, Optional
 
 from appdirs import user_cache_dir
+from requests.adapters import HTTPAdapter
 from web3 import Web3
 
+# orjson is an optional dependency, if it's installed we use it as it decodes JSON several times faster
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
 #import trade_client
 from market_maker_stats.model import AllTrade
 from pymaker.numeric import Wad
@@ -43,8 +55,29 @@ SIZE_MIN = 5
 SIZE_MAX = 100
 SIZE_PRICE_MAX = 30000
 
+# GDAX allows up to 3 public requests per second, so we never fetch more than 3 batches at a time.
+GDAX_CONCURRENCY = 3
+GDAX_MAX_RETRIES = 10
+GDAX_MAX_BACKOFF = 60
+GDAX_MAX_CANDLES = 300
+GDAX_GRANULARITIES = [60, 300, 900, 3600, 21600, 86400]
+
+# Maximum number of calls we put into a single JSON-RPC batch request.
+JSON_RPC_BATCH_SIZE = 200
+
+# Number of blocks after which we consider a block final and safe to cache.
+BLOCK_CONFIRMATIONS = 12
+
+# Maximum number of parameters older SQLite versions accept in a single statement.
+SQLITE_MAX_VARIABLES = 999
+
+SECONDS_PER_UNIT = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+DURATION_PATTERN = re.compile(r'^(\d+)([smhdw])$')
+
 
 class Price:
+    __slots__ = ('timestamp', 'price', 'buy_price', 'sell_price', 'volume')
+
     def __init__(self, timestamp: int, price: Optional[float], buy_price: Optional[float], sell_price: Optional[float], volume: Optional[float]):
         self.timestamp = timestamp
         self.price = price
@@ -78,7 +111,93 @@ class Price:
                      self.volume))
 
     def __repr__(self):
-        return pformat(vars(self))
+        return f"Price(timestamp={self.timestamp}, price={self.price}, buy_price={self.buy_price}, " \
+               f"sell_price={self.sell_price}, volume={self.volume})"
+
+
+class PriceArrays:
+    """Price history stored as parallel NumPy arrays, for the numeric (PnL) code paths."""
+
+    def __init__(self, timestamp: np.ndarray, price: np.ndarray, volume: np.ndarray):
+        assert(isinstance(timestamp, np.ndarray))
+        assert(isinstance(price, np.ndarray))
+        assert(isinstance(volume, np.ndarray))
+        assert(len(timestamp) == len(price) == len(volume))
+
+        self.timestamp = timestamp
+        self.price = price
+        self.volume = volume
+
+    @staticmethod
+    def from_prices(prices: List[Price]):
+        # `None` prices and volumes become `nan`
+        return PriceArrays(timestamp=np.fromiter((price.timestamp for price in prices), dtype=np.int64, count=len(prices)),
+                           price=np.array([price.price for price in prices], dtype=np.float64),
+                           volume=np.array([price.volume for price in prices], dtype=np.float64))
+
+    @staticmethod
+    def concatenate(arrays: list):
+        return PriceArrays(timestamp=np.concatenate([array.timestamp for array in arrays] + [np.empty(0, dtype=np.int64)]),
+                           price=np.concatenate([array.price for array in arrays] + [np.empty(0, dtype=np.float64)]),
+                           volume=np.concatenate([array.volume for array in arrays] + [np.empty(0, dtype=np.float64)]))
+
+    def to_prices(self) -> List[Price]:
+        return [Price(timestamp=timestamp, price=price, buy_price=None, sell_price=None, volume=volume)
+                for timestamp, price, volume in zip(self.timestamp.tolist(), self.price.tolist(), self.volume.tolist())]
+
+    def inverse(self):
+        return PriceArrays(timestamp=self.timestamp, price=1/self.price, volume=self.volume)
+
+    def between(self, start_timestamp: int, end_timestamp: int):
+        mask = (self.timestamp >= start_timestamp) & (self.timestamp <= end_timestamp)
+        return PriceArrays(timestamp=self.timestamp[mask], price=self.price[mask], volume=self.volume[mask])
+
+    def sorted(self):
+        order = np.argsort(self.timestamp, kind='mergesort')
+        return PriceArrays(timestamp=self.timestamp[order], price=self.price[order], volume=self.volume[order])
+
+    def __len__(self):
+        return len(self.timestamp)
+
+
+# Token bucket pacing the requests we send to the GDAX public API. Every request has to `acquire()`
+# a token first. Tokens refill at `rate` per second, up to `burst` of them, so we stay within
+# the limits instead of reacting to 429s.
+class GdaxRateLimiter:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+            self.last_refill = now
+
+            if self.tokens < 1:
+                time.sleep((1 - self.tokens) / self.rate)
+                self.tokens = 1.0
+                self.last_refill = time.monotonic()
+
+            self.tokens -= 1
+
+
+gdax_rate_limiter = GdaxRateLimiter(rate=3, burst=6)
+
+# Keeps connections to the GDAX API alive between requests, so we do not pay for a TCP and TLS
+# handshake on every batch. We do not let the adapter retry anything, as its retries would bypass
+# `gdax_rate_limiter`. All retries are left to `gdax_fetch`, which paces and backs off each of them.
+gdax_session = requests.Session()
+gdax_session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+# Keeps connections alive for JSON-RPC batch requests as well, so that fetching timestamps of many blocks
+# reuses one connection to Infura instead of opening a new one for each batch.
+json_rpc_session = requests.Session()
+json_rpc_session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=8))
+json_rpc_session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=8))
 
 
 class OrderHistoryItem:
@@ -107,8 +226,20 @@ class OrderHistoryItem:
 
 def to_seconds(string: str) -> int:
     assert(isinstance(string, str))
-    seconds_per_unit = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
-    return int(string[:-1]) * seconds_per_unit[string[-1]]
+
+    match = DURATION_PATTERN.match(string)
+    if match is None:
+        raise ValueError(f"Invalid time period: '{string}' (expected a number followed by one of: s, m, h, d, w)")
+
+    return int(match.group(1)) * SECONDS_PER_UNIT[match.group(2)]
+
+
+def positive_int(string: str) -> int:
+    value = int(string)
+    if value <= 0:
+        raise argparse.ArgumentTypeError(f"Invalid value: '{string}' (expected a positive integer)")
+
+    return value
 
 
 def amount_to_size(symbol: str, amount: Wad):
@@ -133,13 +264,127 @@ def amount_in_usd_to_size(amount_in_usd: Wad):
 
 
 def get_block_timestamp(infura: Web3, block_number):
-    return infura.eth.getBlock(block_number).timestamp
+    return get_block_timestamps(infura, [block_number])[block_number]
+
+
+# Fetches timestamps of many blocks at once, using JSON-RPC batch requests, and returns them as
+# a dictionary keyed by block number. Timestamps of blocks which are already final are kept in an
+# on-disk cache, so subsequent runs over overlapping block ranges do not query Infura for them again.
+def get_block_timestamps(infura: Web3, block_numbers: list) -> dict:
+    assert(isinstance(infura, Web3))
+    assert(isinstance(block_numbers, list))
+
+    cache_file = os.path.join(cache_folder(), 'block_timestamps.sqlite')
+    block_numbers = sorted(set(block_numbers))
+    if len(block_numbers) == 0:
+        return {}
+
+    with filelock.FileLock(cache_file + ".lock"):
+        with closing(sqlite3.connect(cache_file)) as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS block_number_timestamps (number INTEGER PRIMARY KEY, timestamp INTEGER)")
+            result = dict(connection.execute("SELECT number, timestamp FROM block_number_timestamps WHERE number BETWEEN ? AND ?",
+                                             (block_numbers[0], block_numbers[-1])).fetchall())
+
+    missing_block_numbers = [block_number for block_number in block_numbers if block_number not in result]
+    if len(missing_block_numbers) == 0:
+        return {block_number: result[block_number] for block_number in block_numbers}
+
+    provider = infura.providers[0]
+    fetched = {}
+    for i in range(0, len(missing_block_numbers), JSON_RPC_BATCH_SIZE):
+        batch = [{"jsonrpc": "2.0", "method": "eth_getBlockByNumber", "params": [hex(block_number), False], "id": block_number}
+                 for block_number in missing_block_numbers[i:i + JSON_RPC_BATCH_SIZE]]
+
+        response = json_rpc_session.post(provider.endpoint_uri, json=batch, **provider.get_request_kwargs())
+        if not response.ok:
+            raise Exception(f"Unable to fetch block timestamps: {response.status_code} {response.reason}")
+
+        # a batch can also be rejected as a whole (rate limiting, batch too large), with a single error object
+        items = json_loads(response.content)
+        if not isinstance(items, list):
+            raise Exception(f"Unable to fetch block timestamps: {items.get('error') if isinstance(items, dict) else items}")
+
+        for item in items:
+            if item.get('result') is None:
+                raise Exception(f"Unable to fetch timestamp of block #{item.get('id')}: {item.get('error')}")
+
+            fetched[item['id']] = int(item['result']['timestamp'], 16)
+
+    # recent blocks can still get reorganized, so we only cache the ones which are deep enough
+    last_final_block_number = infura.eth.blockNumber - BLOCK_CONFIRMATIONS
+    final = [(number, timestamp) for number, timestamp in fetched.items() if number <= last_final_block_number]
+
+    if len(final) > 0:
+        with filelock.FileLock(cache_file + ".lock"):
+            with closing(sqlite3.connect(cache_file)) as connection:
+                with connection:
+                    connection.executemany("INSERT OR REPLACE INTO block_number_timestamps (number, timestamp) VALUES (?, ?)", final)
+
+    result.update(fetched)
+    return {block_number: result[block_number] for block_number in block_numbers}
+
+
+# Block timestamps never change, so we remember them for the lifetime of the process and also
+# keep them in an on-disk cache, so subsequent runs do not need to query Infura for them again.
+# Events coming from the same block end up asking for the same timestamp many times.
+block_hash_timestamps = {}
+
+
+def get_block_hash_timestamp(infura: Web3, block_hash) -> int:
+    if block_hash not in block_hash_timestamps:
+        prefetch_block_hash_timestamps(infura, [block_hash])
+
+    return block_hash_timestamps[block_hash]
+
+
+# Looks up all the blocks in the on-disk cache at once, fetches the ones which are not there yet
+# concurrently and then stores all of them in a single transaction, so that the cache file lock
+# is taken twice per call and not twice for every single block.
+def prefetch_block_hash_timestamps(infura: Web3, block_hashes: list):
+    assert(isinstance(infura, Web3))
+    assert(isinstance(block_hashes, list))
+
+    cache_file = os.path.join(cache_folder(), 'block_timestamps.sqlite')
+    block_hashes = list(set(block_hash for block_hash in block_hashes if block_hash not in block_hash_timestamps))
+    if len(block_hashes) == 0:
+        return
+
+    cached = {}
+    with filelock.FileLock(cache_file + ".lock"):
+        with closing(sqlite3.connect(cache_file)) as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS block_timestamps (hash TEXT PRIMARY KEY, timestamp INTEGER)")
+            for i in range(0, len(block_hashes), SQLITE_MAX_VARIABLES):
+                chunk = block_hashes[i:i + SQLITE_MAX_VARIABLES]
+                cached.update(connection.execute(f"SELECT hash, timestamp FROM block_timestamps WHERE hash IN ({', '.join('?' * len(chunk))})",
+                                                 chunk).fetchall())
+
+    missing_block_hashes = [block_hash for block_hash in block_hashes if block_hash not in cached]
+    if len(missing_block_hashes) > 0:
+        with ThreadPoolExecutor(max_workers=32) as executor:
+            fetched = dict(zip(missing_block_hashes,
+                               executor.map(lambda block_hash: infura.eth.getBlock(block_hash).timestamp, missing_block_hashes)))
+
+        with filelock.FileLock(cache_file + ".lock"):
+            with closing(sqlite3.connect(cache_file)) as connection:
+                with connection:
+                    connection.executemany("INSERT OR REPLACE INTO block_timestamps (hash, timestamp) VALUES (?, ?)", fetched.items())
+
+        cached.update(fetched)
+
+    block_hash_timestamps.update(cached)
 
 
 def get_event_timestamp(infura: Web3, event):
-    return infura.eth.getBlock(event.raw['blockHash']).timestamp
+    return get_block_hash_timestamp(infura, event.raw['blockHash'])
+
 
+def prefetch_event_timestamps(infura: Web3, events: list):
+    # we query each block only once, even if more than one event comes from it
+    prefetch_block_hash_timestamps(infura, [event.raw['blockHash'] for event in events])
 
+
+# The folder does not change while the process is running, so we only need to create it once.
+@lru_cache(maxsize=1)
 def cache_folder():
     db_folder = user_cache_dir("market-maker-stats", "maker")
 
@@ -178,6 +423,17 @@ def get_prices(gdax_price: Optional[str], price_feed: Optional[str], price_histo
         return []
 
 
+def get_price_arrays(gdax_price: Optional[str], price_feed: Optional[str], price_history_file: Optional[str], start_timestamp: int, end_timestamp: int) -> PriceArrays:
+    if price_feed:
+        return get_price_feed_arrays(price_feed, start_timestamp, end_timestamp)
+    elif price_history_file:
+        return get_file_price_arrays(price_history_file, start_timestamp, end_timestamp)
+    elif gdax_price:
+        return get_gdax_price_arrays(gdax_price, start_timestamp, end_timestamp)
+    else:
+        return PriceArrays.from_prices([])
+
+
 def get_order_history(endpoint: Optional[str], start_timestamp: int, end_timestamp: int):
     if endpoint is None:
         return []
@@ -197,25 +453,45 @@ def get_order_history(endpoint: Optional[str], start_timestamp: int, end_timesta
                                                   orders=list(item['orders'])), result.json()['items']))
 
 
-def get_file_prices(filename: str, start_timestamp: int, end_timestamp: int):
-    prices = []
-    with open(filename, "r") as file:
+def read_file_prices(filename: str, start_timestamp: int, end_timestamp: int, assume_sorted: bool):
+    with open(filename, "rb") as file:
         for line in file:
             try:
-                record = json.loads(line)
+                record = json_loads(line)
                 timestamp = record['timestamp']
-                price = record['price']
+
+                # if the file is known to be sorted, there is no point in reading it any further
+                if assume_sorted and timestamp > end_timestamp:
+                    break
 
                 if start_timestamp <= timestamp <= end_timestamp:
-                    prices.append(Price(timestamp=timestamp,
-                                        price=price,
-                                        buy_price=None,
-                                        sell_price=None,
-                                        volume=record['volume'] if 'volume' in record else None))
-            except:
+                    yield timestamp, record['price'], record.get('volume')
+            except (ValueError, KeyError, TypeError):
                 pass
 
-    return sorted(prices, key=lambda price: price.timestamp)
+
+def get_file_prices(filename: str, start_timestamp: int, end_timestamp: int, assume_sorted: bool = False):
+    prices = [Price(timestamp=timestamp, price=price, buy_price=None, sell_price=None, volume=volume)
+              for timestamp, price, volume in read_file_prices(filename, start_timestamp, end_timestamp, assume_sorted)]
+
+    return prices if assume_sorted else sorted(prices, key=attrgetter('timestamp'))
+
+
+def get_file_price_arrays(filename: str, start_timestamp: int, end_timestamp: int, assume_sorted: bool = False) -> PriceArrays:
+    timestamps = []
+    prices = []
+    volumes = []
+    for timestamp, price, volume in read_file_prices(filename, start_timestamp, end_timestamp, assume_sorted):
+        timestamps.append(timestamp)
+        prices.append(price)
+        volumes.append(volume)
+
+    # missing volumes become `nan`
+    result = PriceArrays(timestamp=np.array(timestamps, dtype=np.int64),
+                         price=np.array(prices, dtype=np.float64),
+                         volume=np.array(volumes, dtype=np.float64))
+
+    return result if assume_sorted else result.sorted()
 
 
 def get_price_feed(endpoint: str, start_timestamp: int, end_timestamp: int):
@@ -229,77 +505,133 @@ def get_price_feed(endpoint: str, start_timestamp: int, end_timestamp: int):
 
         return result
 
-    result = requests.get(f"{endpoint}?min={start_timestamp}&max={end_timestamp}", timeout=15.5)
-    if not result.ok:
-        raise Exception(f"Failed to fetch price feed history: {result.status_code} {result.reason}")
-
     return list(map(lambda item: Price(timestamp=item['timestamp'],
                                        price=float(item['data']['price']) if 'price' in item['data'] else None,
                                        buy_price=float(item['data']['buyPrice']) if 'buyPrice' in item['data'] else None,
                                        sell_price=float(item['data']['sellPrice']) if 'sellPrice' in item['data'] else None,
-                                       volume=None), result.json()['items']))
+                                       volume=None), get_price_feed_items(endpoint, start_timestamp, end_timestamp)))
 
 
-def get_gdax_prices(product: str, start_timestamp: int, end_timestamp: int):
-    prices = []
-    timestamp = gdax_batch_begin(start_timestamp)
+def get_price_feed_arrays(endpoint: str, start_timestamp: int, end_timestamp: int) -> PriceArrays:
+    # price history for PnL calculations, built straight into arrays without creating a `Price` for every minute
+    if endpoint.startswith("fixed:"):
+        timestamps = np.arange(start_timestamp, end_timestamp, 60, dtype=np.int64)
+        return PriceArrays(timestamp=timestamps,
+                           price=np.full(len(timestamps), float(endpoint.replace("fixed:", ""))),
+                           volume=np.ones(len(timestamps)))
+
+    # price feeds do not report any volume, so just like with `fixed:` prices each sample gets the same weight
+    # and VWAPs become plain averages of the feed. a sample without a price would make every VWAP window
+    # containing it `nan`, so we skip such samples and they get treated as gaps in the price history instead
+    items = [item for item in get_price_feed_items(endpoint, start_timestamp, end_timestamp) if 'price' in item['data']]
+    return PriceArrays(timestamp=np.fromiter((item['timestamp'] for item in items), dtype=np.int64, count=len(items)),
+                       price=np.fromiter((float(item['data']['price']) for item in items), dtype=np.float64, count=len(items)),
+                       volume=np.ones(len(items)))
+
+
+def get_price_feed_items(endpoint: str, start_timestamp: int, end_timestamp: int) -> list:
+    result = requests.get(f"{endpoint}?min={start_timestamp}&max={end_timestamp}", timeout=15.5)
+    if not result.ok:
+        raise Exception(f"Failed to fetch price feed history: {result.status_code} {result.reason}")
+
+    return json_loads(result.content)['items']
+
+
+def get_gdax_prices(product: str, start_timestamp: int, end_timestamp: int, granularity: int = 60) -> List[Price]:
+    return get_gdax_price_arrays(product, start_timestamp, end_timestamp, granularity).to_prices()
+
+
+def get_gdax_price_arrays(product: str, start_timestamp: int, end_timestamp: int, granularity: int = 60) -> PriceArrays:
+    assert(granularity in GDAX_GRANULARITIES)
+
+    batches = []
+    timestamp = gdax_batch_begin(start_timestamp, granularity)
     while timestamp <= end_timestamp:
         timestamp_range_start = timestamp
-        timestamp_range_end = gdax_batch_end(timestamp)
-        prices = prices + get_gdax_partial(product, timestamp_range_start, timestamp_range_end)
+        timestamp_range_end = gdax_batch_end(timestamp, granularity)
+        batches.append((timestamp_range_start, timestamp_range_end))
         timestamp = timestamp_range_end
 
-    prices = list(filter(lambda price: start_timestamp <= price.timestamp <= end_timestamp, prices))
-    return sorted(prices, key=lambda price: price.timestamp)
+    # Batches are independent of each other, so we fetch them concurrently. Batches which are
+    # already cached on disk get returned straight away, without hitting the GDAX API.
+    with ThreadPoolExecutor(max_workers=GDAX_CONCURRENCY) as executor:
+        partials = list(executor.map(lambda batch: get_gdax_partial(product, batch[0], batch[1], granularity), batches))
 
+    return PriceArrays.concatenate(partials).between(start_timestamp, end_timestamp).sorted()
 
-def gdax_batch_begin(start_timestamp):
-    return int(datetime.datetime.fromtimestamp(start_timestamp).replace(hour=0, minute=0, second=0, microsecond=0).timestamp())
 
+# Each batch spans as many candles as GDAX returns in a single response. Batches are aligned
+# to multiples of their size, so they are the same regardless of when the requested period
+# starts and can be reused from the cache by subsequent runs.
+def gdax_batch_size(granularity: int) -> int:
+    return GDAX_MAX_CANDLES * granularity
 
-def gdax_batch_end(batch_begin):
-    # TODO what about leap seconds...?
-    return int((datetime.datetime.fromtimestamp(batch_begin) + datetime.timedelta(hours=4)).timestamp())
 
+def gdax_batch_begin(start_timestamp: int, granularity: int = 60) -> int:
+    return start_timestamp - start_timestamp % gdax_batch_size(granularity)
 
-def gdax_fetch(url):
+
+def gdax_batch_end(batch_begin: int, granularity: int = 60) -> int:
+    return batch_begin + gdax_batch_size(granularity)
+
+
+def gdax_backoff(attempt: int, retry_after: Optional[str] = None) -> float:
     try:
-        data = requests.get(url, timeout=30.5).json()
-    except:
-        logging.info("GDAX API network error, waiting 10 secs...")
-        time.sleep(10)
-        return gdax_fetch(url)
+        delay = float(retry_after)
+    except (TypeError, ValueError):
+        delay = 2 * 2 ** attempt
+
+    return min(delay, GDAX_MAX_BACKOFF)
+
+
+def gdax_fetch(url):
+    for attempt in range(GDAX_MAX_RETRIES):
+        gdax_rate_limiter.acquire()
+
+        try:
+            response = gdax_session.get(url, timeout=30.5)
+            data = json_loads(response.content)
+        except (requests.exceptions.RequestException, ValueError):
+            backoff = gdax_backoff(attempt)
+            logging.info(f"GDAX API network error, waiting {backoff} secs...")
+            time.sleep(backoff)
+            continue
+
+        # candles always come as a list, anything else (usually `{"message": ...}`) means GDAX refused the request
+        if response.status_code == 429 or not isinstance(data, list):
+            backoff = gdax_backoff(attempt, response.headers.get('Retry-After'))
+            logging.info(f"GDAX API rate limiting, slowing down for {backoff} secs...")
+            time.sleep(backoff)
+            continue
 
-    if 'message' in data:
-        logging.info("GDAX API rate limiting, slowing down for 2 secs...")
-        time.sleep(2)
-        return gdax_fetch(url)
+        return data
 
-    return data
+    raise Exception(f"Unable to fetch data from GDAX API after {GDAX_MAX_RETRIES} attempts: {url}")
 
 
-def get_gdax_partial(product: str, timestamp_range_start: int, timestamp_range_end: int) -> List[Price]:
+def get_gdax_partial(product: str, timestamp_range_start: int, timestamp_range_end: int, granularity: int = 60) -> PriceArrays:
     assert(isinstance(product, str))
     assert(isinstance(timestamp_range_start, int))
     assert(isinstance(timestamp_range_end, int))
+    assert(isinstance(granularity, int))
 
     if product == 'USD-ETH':
-        return list(map(lambda price: price.inverse(), get_gdax_partial('ETH-USD', timestamp_range_start, timestamp_range_end)))
+        return get_gdax_partial('ETH-USD', timestamp_range_start, timestamp_range_end, granularity).inverse()
 
     if product == 'USD-BTC':
-        return list(map(lambda price: price.inverse(), get_gdax_partial('BTC-USD', timestamp_range_start, timestamp_range_end)))
+        return get_gdax_partial('BTC-USD', timestamp_range_start, timestamp_range_end, granularity).inverse()
 
     # We only cache batches if their end timestamp is at least one hour in the past.
     # There is no good reason for choosing exactly one hour as the cutoff time.
     can_cache = timestamp_range_end < int(time.time()) - 3600
-    cache_file = os.path.join(cache_folder(), f'gdax_{product.upper()}_{timestamp_range_start}_{timestamp_range_end}_60.json')
+    cache_file = os.path.join(cache_folder(), f'gdax_{product.upper()}_{timestamp_range_start}_{timestamp_range_end}_{granularity}.npy')
 
     start = datetime.datetime.fromtimestamp(timestamp_range_start, pytz.UTC)
     end = datetime.datetime.fromtimestamp(timestamp_range_end, pytz.UTC)
     url = f"https://api.gdax.com/products/{product.upper()}/candles?" \
           f"start={iso_8601(start)}&" \
           f"end={iso_8601(end)}&" \
-          f"granularity=60"
+          f"granularity={granularity}"
 
     # Try do get data from cache
     data_from_cache = None
@@ -307,31 +639,27 @@ def get_gdax_partial(product: str, timestamp_range_start: int, timestamp_range_e
         with filelock.FileLock(cache_file + ".lock"):
             try:
                 if os.path.isfile(cache_file):
-                    with open(cache_file, 'r') as infile:
-                        data_from_cache = json.load(infile)
+                    data_from_cache = np.load(cache_file)
             except:
                 pass
 
     if data_from_cache is None:
-        data_from_server = gdax_fetch(url)
+        data_from_server = np.asarray(gdax_fetch(url), dtype=np.float64).reshape(-1, 6)
 
         if can_cache:
             with filelock.FileLock(cache_file + ".lock"):
                 try:
-                    with open(cache_file, 'w') as outfile:
-                        json.dump(data_from_server, outfile)
+                    np.save(cache_file, data_from_server)
                 except:
                     pass
 
     # data is: [[ time, low, high, open, close, volume ], [...]]
     data = data_from_cache if data_from_cache is not None else data_from_server
-    prices = list(map(lambda array: Price(timestamp=array[0],
-                                          price=(array[1] + array[2]) / 2,
-                                          buy_price=None,
-                                          sell_price=None,
-                                          volume=array[5]), data))
+    prices = PriceArrays(timestamp=data[:, 0].astype(np.int64),
+                         price=(data[:, 1] + data[:, 2]) / 2,
+                         volume=data[:, 5])
 
-    return list(filter(lambda price: timestamp_range_start <= price.timestamp <= timestamp_range_end, prices))
+    return prices.between(timestamp_range_start, timestamp_range_end)
 
 
 def get_day(timestamp: int):
@@ -354,16 +682,35 @@ def timestamp_to_x(timestamp):
     return date2num(datetime.datetime.fromtimestamp(int(timestamp), tz=pytz.UTC))
 
 
+def timestamps_to_x(timestamps) -> np.ndarray:
+    # same as applying `timestamp_to_x` to each element, but `date2num` only gets called once
+    from matplotlib.dates import date2num
+    epoch = date2num(datetime.datetime.fromtimestamp(0, tz=pytz.UTC))
+    return np.asarray(timestamps, dtype=np.float64) / 86400.0 + epoch
+
+
+def trade_timestamps(trades: list) -> np.ndarray:
+    return np.fromiter(map(attrgetter('timestamp'), trades), dtype=np.int64, count=len(trades))
+
+
 def sort_trades(trades: list) -> list:
-    return sorted(trades, key=lambda trade: trade.timestamp, reverse=True)
+    # mergesort is stable, so trades with equal timestamps keep their relative order like with `sorted()`
+    order = np.argsort(-trade_timestamps(trades), kind='mergesort')
+    return [trades[index] for index in order]
 
 
 def sort_trades_for_pnl(trades: list) -> list:
-    return sorted(trades, key=lambda trade: trade.timestamp)
+    order = np.argsort(trade_timestamps(trades), kind='mergesort')
+    return [trades[index] for index in order]
+
+
+# PnL calculations only need these fields and only as floats, so we convert them from `Wad`s once
+# upfront instead of doing `Wad` arithmetic and conversions for each trade over and over again.
+FloatTrade = namedtuple('FloatTrade', 'timestamp price amount money is_sell')
 
 
-def sum_wads(iterable):
-    return reduce(lambda x, y: x + y, iterable, Wad(0))
+def to_float_trades(trades: list) -> List[FloatTrade]:
+    return [FloatTrade(trade.timestamp, float(trade.price), float(trade.amount), float(trade.money), trade.is_sell) for trade in trades]
 
 
 def initialize_logging():
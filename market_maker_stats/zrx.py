@@ -15,17 +15,21 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from operator import attrgetter
+from typing import List, Tuple
 
 from web3 import Web3
 
-from market_maker_stats.util import get_event_timestamp
+from market_maker_stats.util import get_block_timestamps
 from pymaker import Address
 from pymaker.numeric import Wad
-from pymaker.zrx import LogFill
+from pymaker.zrx import LogFill, ZrxExchange
 
 
 class Trade:
+    __slots__ = ('exchange', 'maker', 'pair', 'timestamp', 'price', 'amount', 'money', 'is_sell', 'taker')
+
     def __init__(self, exchange: str, maker: str, pair: str, timestamp: int, price: Wad, amount: Wad, money: Wad, is_sell: bool, taker: Address):
         self.exchange = exchange
         self.maker = maker
@@ -38,26 +42,63 @@ class Trade:
         self.taker = taker
 
 
-def zrx_trades(infura: Web3, market_maker_address: Address, buy_token: str, buy_token_address: Address, buy_token_decimals: int, sell_token: str, sell_token_addresses: List[Address], sell_token_decimals: int, past_fills: List[LogFill], exchange_name: str) -> list:
+# Fetches `LogFill` events from the last `past_blocks` blocks up to and including `block_number`.
+# Instead of one `eth_getLogs` query spanning the whole range, which nodes tend to either throttle
+# or time out on, the range gets split into chunks of `chunk_size` blocks and up to `workers` of them
+# are queried concurrently. Events are returned in the order they appeared on the chain.
+def zrx_past_fills(exchange: ZrxExchange, block_number: int, past_blocks: int, event_filter: dict, chunk_size: int, workers: int) -> List[LogFill]:
+    assert(isinstance(exchange, ZrxExchange))
+    assert(isinstance(block_number, int))
+    assert(isinstance(past_blocks, int))
+    assert(isinstance(event_filter, dict))
+    assert(isinstance(chunk_size, int) and chunk_size > 0)
+    assert(isinstance(workers, int) and workers > 0)
+
+    from_block = max(block_number - past_blocks, 0)
+    block_ranges = [(start, min(start + chunk_size - 1, block_number)) for start in range(from_block, block_number + 1, chunk_size)]
+
+    # `maker` is an indexed argument of `LogFill`, so web3 turns filtering by it into an `eth_getLogs`
+    # topic and the node only returns matching logs. filters on non-indexed arguments would be
+    # applied on our side, after all `LogFill` logs from the range have been downloaded
+    def past_fill_range(block_range: tuple) -> List[LogFill]:
+        filter_params = {'fromBlock': block_range[0], 'toBlock': block_range[1], 'filter': event_filter}
+
+        # `ZrxExchange` only lets us query the last N blocks, so we go through its private web3 contract
+        # the same way `past_fill()` does internally. this relies on the `lib/pymaker` revision which works
+        # with web3 3.16.4, where `_contract` is a web3 contract with `pastEvents()`, and `LogFill` gets
+        # built from the raw event. it needs revisiting whenever `lib/pymaker` gets upgraded
+        return list(map(LogFill, exchange._contract.pastEvents('LogFill', filter_params).get(False)))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        past_fills = [log_fill for log_fills in executor.map(past_fill_range, block_ranges) for log_fill in log_fills]
+
+    return sorted(past_fills, key=lambda log_fill: (log_fill.raw['blockNumber'], log_fill.raw['logIndex']))
+
+
+def zrx_trades(infura: Web3, market_maker_address: Address, buy_token: str, buy_token_address: Address, buy_token_decimals: int, sell_token: str, sell_token_addresses: Tuple[Address, ...], sell_token_decimals: int, past_fills: List[LogFill], exchange_name: str) -> list:
     assert(isinstance(infura, Web3))
     assert(isinstance(market_maker_address, Address))
     assert(isinstance(buy_token, str))
     assert(isinstance(buy_token_address, Address))
     assert(isinstance(buy_token_decimals, int))
     assert(isinstance(sell_token, str))
-    assert(isinstance(sell_token_addresses, list))
+    assert(isinstance(sell_token_addresses, tuple))
     assert(isinstance(sell_token_decimals, int))
     assert(isinstance(past_fills, list))
 
     pair = sell_token + '-' + buy_token
 
+    # timestamps of all blocks we are interested in get fetched upfront, in JSON-RPC batches
+    block_timestamps = get_block_timestamps(infura, [log_fill.raw['blockNumber'] for log_fill in past_fills
+                                                     if log_fill.maker == market_maker_address])
+
     def sell_trades() -> List[Trade]:
-        return list(map(lambda log_fill: Trade(exchange_name, log_fill.maker, pair, get_event_timestamp(infura, log_fill), (log_fill.filled_buy_amount * Wad.from_number(10 ** (18 - buy_token_decimals))) / (log_fill.filled_pay_amount * Wad.from_number(10 ** (18 - sell_token_decimals))), log_fill.filled_pay_amount * Wad.from_number(10 ** (18 - sell_token_decimals)), log_fill.filled_buy_amount * Wad.from_number(10 ** (18 - buy_token_decimals)), True, log_fill.taker),
+        return list(map(lambda log_fill: Trade(exchange_name, log_fill.maker, pair, block_timestamps[log_fill.raw['blockNumber']], (log_fill.filled_buy_amount * Wad.from_number(10 ** (18 - buy_token_decimals))) / (log_fill.filled_pay_amount * Wad.from_number(10 ** (18 - sell_token_decimals))), log_fill.filled_pay_amount * Wad.from_number(10 ** (18 - sell_token_decimals)), log_fill.filled_buy_amount * Wad.from_number(10 ** (18 - buy_token_decimals)), True, log_fill.taker),
                         filter(lambda log_take: log_take.maker == market_maker_address and log_take.buy_token == buy_token_address and log_take.pay_token in sell_token_addresses, past_fills)))
 
     def buy_trades() -> List[Trade]:
-        return list(map(lambda log_fill: Trade(exchange_name, log_fill.maker, pair, get_event_timestamp(infura, log_fill), (log_fill.filled_pay_amount * Wad.from_number(10 ** (18 - buy_token_decimals))) / (log_fill.filled_buy_amount * Wad.from_number(10 ** (18 - sell_token_decimals))), log_fill.filled_buy_amount * Wad.from_number(10 ** (18 - sell_token_decimals)), log_fill.filled_pay_amount * Wad.from_number(10 ** (18 - buy_token_decimals)), False, log_fill.taker),
+        return list(map(lambda log_fill: Trade(exchange_name, log_fill.maker, pair, block_timestamps[log_fill.raw['blockNumber']], (log_fill.filled_pay_amount * Wad.from_number(10 ** (18 - buy_token_decimals))) / (log_fill.filled_buy_amount * Wad.from_number(10 ** (18 - sell_token_decimals))), log_fill.filled_buy_amount * Wad.from_number(10 ** (18 - sell_token_decimals)), log_fill.filled_pay_amount * Wad.from_number(10 ** (18 - buy_token_decimals)), False, log_fill.taker),
                         filter(lambda log_take: log_take.maker == market_maker_address and log_take.buy_token in sell_token_addresses and log_take.pay_token == buy_token_address, past_fills)))
 
     trades = sell_trades() + buy_trades()
-    return sorted(trades, key=lambda trade: trade.timestamp)
+    return sorted(trades, key=attrgetter('timestamp'))
@@ -24,9 +24,9 @@ from typing import List
 from web3 import Web3, HTTPProvider
 
 from market_maker_stats.chart import initialize_charting, draw_chart, prepare_order_history_for_charting
-from market_maker_stats.zrx import zrx_trades, Trade
+from market_maker_stats.zrx import zrx_trades, zrx_past_fills, Trade
 from market_maker_stats.util import amount_in_usd_to_size, get_gdax_prices, Price, get_block_timestamp, \
-    timestamp_to_x, initialize_logging, get_order_history, get_prices
+    timestamp_to_x, initialize_logging, get_order_history, get_prices, positive_int
 from pymaker import Address
 from pymaker.zrx import ZrxExchange
 
@@ -39,6 +39,8 @@ class ZrxMarketMakerChart:
         parser.add_argument("--rpc-host", help="JSON-RPC host (default: `localhost')", default="localhost", type=str)
         parser.add_argument("--rpc-port", help="JSON-RPC port (default: `8545')", default=8545, type=int)
         parser.add_argument("--rpc-timeout", help="JSON-RPC timeout (in seconds, default: 60)", type=int, default=60)
+        parser.add_argument("--rpc-chunk-size", help="Number of blocks to query for events at once (default: 10000)", type=positive_int, default=10000)
+        parser.add_argument("--rpc-workers", help="Number of event queries to run concurrently (default: 8)", type=positive_int, default=8)
         parser.add_argument("--exchange-address", help="Ethereum address of the 0x contract", required=True, type=str)
         parser.add_argument("--buy-token-address", help="Ethereum address of the buy token", required=True, type=str)
         parser.add_argument("--buy-token-decimals", help="Number of decimals for the buy token", type=int, default=18)
@@ -55,24 +57,34 @@ class ZrxMarketMakerChart:
                                                    " Will get displayed on-screen if empty", required=False, type=str)
         self.arguments = parser.parse_args(args)
 
+        initialize_logging()
+
         self.web3 = Web3(HTTPProvider(endpoint_uri=f"http://{self.arguments.rpc_host}:{self.arguments.rpc_port}",
                                       request_kwargs={'timeout': self.arguments.rpc_timeout}))
         self.infura = Web3(HTTPProvider(endpoint_uri=f"https://mainnet.infura.io/", request_kwargs={'timeout': 120}))
+
+        # without a local node available, we send all our queries to Infura, including
+        # the ones for `LogFill` events which are much slower there than on a local node
+        if not self.web3.isConnected():
+            logging.warning(f"Local node at {self.web3.providers[0].endpoint_uri} is not reachable,"
+                            f" falling back to Infura (mainnet) for all queries")
+            self.web3 = self.infura
+
         self.buy_token_address = Address(self.arguments.buy_token_address)
         self.sell_token_address = Address(self.arguments.sell_token_address)
         self.old_sell_token_address = Address(self.arguments.old_sell_token_address) if self.arguments.old_sell_token_address else None
-        self.sell_token_addresses = list(filter(lambda address: address is not None, [self.sell_token_address, self.old_sell_token_address]))
+        self.sell_token_addresses = tuple(address for address in (self.sell_token_address, self.old_sell_token_address) if address is not None)
         self.market_maker_address = Address(self.arguments.market_maker_address)
         self.exchange = ZrxExchange(web3=self.web3, address=Address(self.arguments.exchange_address))
 
         initialize_charting(self.arguments.output)
-        initialize_logging()
 
     def main(self):
-        start_timestamp = get_block_timestamp(self.infura, self.web3.eth.blockNumber - self.arguments.past_blocks)
+        block_number = self.web3.eth.blockNumber
+        start_timestamp = get_block_timestamp(self.infura, max(block_number - self.arguments.past_blocks, 0))
         end_timestamp = int(time.time())
 
-        events = self.exchange.past_fill(self.arguments.past_blocks, {'maker': self.market_maker_address.address})
+        events = zrx_past_fills(self.exchange, block_number, self.arguments.past_blocks, {'maker': self.market_maker_address.address}, self.arguments.rpc_chunk_size, self.arguments.rpc_workers)
         trades = zrx_trades(self.infura, self.market_maker_address, 'DAI', self.buy_token_address, self.arguments.buy_token_decimals, 'WETH', self.sell_token_addresses, self.arguments.sell_token_decimals, events, '-')
 
         prices = get_prices(self.arguments.gdax_price, self.arguments.price_feed, None, start_timestamp, end_timestamp)
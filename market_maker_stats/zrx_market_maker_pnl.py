@@ -19,12 +19,13 @@ import argparse
 import logging
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 from web3 import Web3, HTTPProvider
 
 from market_maker_stats.pnl import get_approx_vwaps, pnl_text, pnl_chart
-from market_maker_stats.zrx import zrx_trades
-from market_maker_stats.util import get_block_timestamp, sort_trades_for_pnl, get_gdax_prices, get_prices
+from market_maker_stats.zrx import zrx_trades, zrx_past_fills
+from market_maker_stats.util import get_block_timestamp, sort_trades_for_pnl, to_float_trades, get_gdax_prices, get_price_arrays, positive_int
 from pymaker import Address
 from pymaker.zrx import ZrxExchange
 
@@ -37,6 +38,8 @@ class ZrxMarketMakerPnl:
         parser.add_argument("--rpc-host", help="JSON-RPC host (default: `localhost')", default="localhost", type=str)
         parser.add_argument("--rpc-port", help="JSON-RPC port (default: `8545')", default=8545, type=int)
         parser.add_argument("--rpc-timeout", help="JSON-RPC timeout (in seconds, default: 60)", type=int, default=60)
+        parser.add_argument("--rpc-chunk-size", help="Number of blocks to query for events at once (default: 10000)", type=positive_int, default=10000)
+        parser.add_argument("--rpc-workers", help="Number of event queries to run concurrently (default: 8)", type=positive_int, default=8)
         parser.add_argument("--exchange-address", help="Ethereum address of the 0x contract", required=True, type=str)
         parser.add_argument("--market-maker-address", help="Ethereum account of the market maker to analyze", required=True, type=str)
         parser.add_argument("--gdax-price", help="GDAX product (ETH-USD, BTC-USD) to use as the price history source", type=str)
@@ -59,13 +62,24 @@ class ZrxMarketMakerPnl:
 
         self.arguments = parser.parse_args(args)
 
+        logging.basicConfig(format='%(asctime)-15s %(levelname)-8s %(message)s', level=logging.INFO)
+        logging.getLogger("filelock").setLevel(logging.WARNING)
+
         self.web3 = Web3(HTTPProvider(endpoint_uri=f"http://{self.arguments.rpc_host}:{self.arguments.rpc_port}",
                                       request_kwargs={'timeout': self.arguments.rpc_timeout}))
         self.infura = Web3(HTTPProvider(endpoint_uri=f"https://mainnet.infura.io/", request_kwargs={'timeout': 120}))
+
+        # without a local node available, we send all our queries to Infura, including
+        # the ones for `LogFill` events which are much slower there than on a local node
+        if not self.web3.isConnected():
+            logging.warning(f"Local node at {self.web3.providers[0].endpoint_uri} is not reachable,"
+                            f" falling back to Infura (mainnet) for all queries")
+            self.web3 = self.infura
+
         self.buy_token_address = Address(self.arguments.buy_token_address)
         self.sell_token_address = Address(self.arguments.sell_token_address)
         self.old_sell_token_address = Address(self.arguments.old_sell_token_address) if self.arguments.old_sell_token_address else None
-        self.sell_token_addresses = list(filter(lambda address: address is not None, [self.sell_token_address, self.old_sell_token_address]))
+        self.sell_token_addresses = tuple(address for address in (self.sell_token_address, self.old_sell_token_address) if address is not None)
         self.market_maker_address = Address(self.arguments.market_maker_address)
         self.exchange = ZrxExchange(web3=self.web3, address=Address(self.arguments.exchange_address))
 
@@ -73,20 +87,28 @@ class ZrxMarketMakerPnl:
             import matplotlib
             matplotlib.use('Agg')
 
-        logging.basicConfig(format='%(asctime)-15s %(levelname)-8s %(message)s', level=logging.INFO)
-        logging.getLogger("filelock").setLevel(logging.WARNING)
-
     def main(self):
-        start_timestamp = get_block_timestamp(self.infura, self.web3.eth.blockNumber - self.arguments.past_blocks)
         end_timestamp = int(time.time())
 
-        events = self.exchange.past_fill(self.arguments.past_blocks, {'maker': self.market_maker_address.address})
-        trades = zrx_trades(self.infura, self.market_maker_address, self.arguments.buy_token, self.buy_token_address, self.arguments.buy_token_decimals, self.arguments.sell_token, self.sell_token_addresses, self.arguments.sell_token_decimals, events, '-')
-        trades = sort_trades_for_pnl(trades)
+        # we read the head only once, so fill events and prices cover exactly the same range of blocks
+        block_number = self.web3.eth.blockNumber
+        start_block_number = max(block_number - self.arguments.past_blocks, 0)
+
+        # fetching fill events and fetching prices do not depend on each other, so we run them
+        # concurrently, the latter only needs the timestamp of the first block to start
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            events_future = executor.submit(zrx_past_fills, self.exchange, block_number, self.arguments.past_blocks, {'maker': self.market_maker_address.address}, self.arguments.rpc_chunk_size, self.arguments.rpc_workers)
+
+            start_timestamp = get_block_timestamp(self.infura, start_block_number)
+            prices_future = executor.submit(get_price_arrays, self.arguments.gdax_price, self.arguments.price_feed, self.arguments.price_history_file, start_timestamp, end_timestamp)
+
+            trades = zrx_trades(self.infura, self.market_maker_address, self.arguments.buy_token, self.buy_token_address, self.arguments.buy_token_decimals, self.arguments.sell_token, self.sell_token_addresses, self.arguments.sell_token_decimals, events_future.result(), '-')
+            trades = to_float_trades(sort_trades_for_pnl(trades))
+
+            prices = prices_future.result()
 
-        prices = get_prices(self.arguments.gdax_price, self.arguments.price_feed, self.arguments.price_history_file, start_timestamp, end_timestamp)
         vwaps = get_approx_vwaps(prices, self.arguments.vwap_minutes)
-        vwaps_start = prices[0].timestamp
+        vwaps_start = int(prices.timestamp[0])
 
         if self.arguments.text:
             pnl_text(trades, vwaps, vwaps_start, self.arguments.buy_token, self.arguments.sell_token, self.arguments.vwap_minutes, self.arguments.output)
@@ -16,19 +16,14 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import argparse
-import datetime
-import json
 import logging
 import sys
-from typing import List
 
-import pytz
-from texttable import Texttable
 from web3 import Web3, HTTPProvider
 
 from market_maker_stats.trades import text_trades, json_trades
-from market_maker_stats.zrx import zrx_trades, Trade
-from market_maker_stats.util import format_timestamp, sort_trades
+from market_maker_stats.zrx import zrx_trades, zrx_past_fills, Trade
+from market_maker_stats.util import sort_trades, positive_int
 from pymaker import Address
 from pymaker.zrx import ZrxExchange
 
@@ -41,6 +36,8 @@ class ZrxMarketMakerTrades:
         parser.add_argument("--rpc-host", help="JSON-RPC host (default: `localhost')", default="localhost", type=str)
         parser.add_argument("--rpc-port", help="JSON-RPC port (default: `8545')", default=8545, type=int)
         parser.add_argument("--rpc-timeout", help="JSON-RPC timeout (in seconds, default: 60)", type=int, default=60)
+        parser.add_argument("--rpc-chunk-size", help="Number of blocks to query for events at once (default: 10000)", type=positive_int, default=10000)
+        parser.add_argument("--rpc-workers", help="Number of event queries to run concurrently (default: 8)", type=positive_int, default=8)
         parser.add_argument("--exchange-address", help="Ethereum address of the 0x contract", required=True, type=str)
         parser.add_argument("--exchange-name", help="Exchange name for including in the JSON file", required=True, type=str)
         parser.add_argument("--buy-token", help="Name of the buy token", required=True, type=str)
@@ -60,21 +57,29 @@ class ZrxMarketMakerTrades:
 
         self.arguments = parser.parse_args(args)
 
+        logging.basicConfig(format='%(asctime)-15s %(levelname)-8s %(message)s', level=logging.INFO)
+        logging.getLogger("filelock").setLevel(logging.WARNING)
+
         self.web3 = Web3(HTTPProvider(endpoint_uri=f"http://{self.arguments.rpc_host}:{self.arguments.rpc_port}",
                                       request_kwargs={'timeout': self.arguments.rpc_timeout}))
         self.infura = Web3(HTTPProvider(endpoint_uri=f"https://mainnet.infura.io/", request_kwargs={'timeout': 120}))
+
+        # without a local node available, we send all our queries to Infura, including
+        # the ones for `LogFill` events which are much slower there than on a local node
+        if not self.web3.isConnected():
+            logging.warning(f"Local node at {self.web3.providers[0].endpoint_uri} is not reachable,"
+                            f" falling back to Infura (mainnet) for all queries")
+            self.web3 = self.infura
+
         self.buy_token_address = Address(self.arguments.buy_token_address)
         self.sell_token_address = Address(self.arguments.sell_token_address)
         self.old_sell_token_address = Address(self.arguments.old_sell_token_address) if self.arguments.old_sell_token_address else None
-        self.sell_token_addresses = list(filter(lambda address: address is not None, [self.sell_token_address, self.old_sell_token_address]))
+        self.sell_token_addresses = tuple(address for address in (self.sell_token_address, self.old_sell_token_address) if address is not None)
         self.market_maker_address = Address(self.arguments.market_maker_address)
         self.exchange = ZrxExchange(web3=self.web3, address=Address(self.arguments.exchange_address))
 
-        logging.basicConfig(format='%(asctime)-15s %(levelname)-8s %(message)s', level=logging.INFO)
-        logging.getLogger("filelock").setLevel(logging.WARNING)
-
     def main(self):
-        past_fills = self.exchange.past_fill(self.arguments.past_blocks, {'maker': self.market_maker_address.address})
+        past_fills = zrx_past_fills(self.exchange, self.web3.eth.blockNumber, self.arguments.past_blocks, {'maker': self.market_maker_address.address}, self.arguments.rpc_chunk_size, self.arguments.rpc_workers)
         trades = zrx_trades(self.infura, self.market_maker_address, self.arguments.buy_token, self.buy_token_address, self.arguments.buy_token_decimals, self.arguments.sell_token, self.sell_token_addresses, self.arguments.sell_token_decimals, past_fills, self.arguments.exchange_name)
         trades = sort_trades(trades)
 
@@ -15,8 +15,11 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from market_maker_stats.pnl import granularize_prices
-from market_maker_stats.util import Price
+import numpy as np
+
+from market_maker_stats.pnl import granularize_prices, granularize_price_arrays, get_approx_vwaps, rolling_vwaps_loop, \
+    rolling_vwaps_numpy
+from market_maker_stats.util import Price, PriceArrays, get_price_feed_arrays
 
 
 def test_granularize_prices_fills_gaps():
@@ -72,3 +75,65 @@ def test_granularize_prices_removes_duplicates():
                                    Price(1518440760, 1.7, None, None, 14),
                                    Price(1518440820, 0, 0, 0, 0),
                                    Price(1518440885, 1.2, None, None, 18)]
+
+
+def test_granularize_price_arrays_fills_gaps_and_removes_duplicates():
+    # given
+    # 1518440700 = 2018-02-12 13:05:00 UTC
+    prices = PriceArrays.from_prices([Price(1518440700, 1.5, None, None, 10),
+                                      Price(1518440730, 1.51, None, None, 11),
+                                      Price(1518440760, 1.7, None, None, 14),
+                                      Price(1518440885, 1.2, None, None, 18),
+                                      Price(1518440910, 1.1, None, None, 29)])
+
+    # when
+    granularized_prices = granularize_price_arrays(prices)
+
+    # then
+    assert granularized_prices.timestamp.tolist() == [1518440700, 1518440760, 1518440820, 1518440885]
+    assert granularized_prices.price.tolist() == [1.5, 1.7, 0.0, 1.2]
+    assert granularized_prices.volume.tolist() == [10, 14, 0.0, 18]
+
+
+def test_get_approx_vwaps():
+    # given
+    prices = PriceArrays.from_prices([Price(1518440700, 1.0, None, None, 10),
+                                      Price(1518440760, 2.0, None, None, 30),
+                                      Price(1518440880, 4.0, None, None, 10)])
+
+    # when
+    vwaps = get_approx_vwaps(prices, 2)
+
+    # then
+    assert np.allclose(vwaps, [1.75, 2.0, 4.0])
+
+
+def test_get_approx_vwaps_weights_price_feed_samples_evenly(mocker):
+    # given
+    mocker.patch('market_maker_stats.util.get_price_feed_items', return_value=[
+        {'timestamp': 1518440700, 'data': {'price': '1.0'}},
+        {'timestamp': 1518440760, 'data': {'price': '2.0', 'buyPrice': '1.9', 'sellPrice': '2.1'}},
+        {'timestamp': 1518440820, 'data': {'buyPrice': '2.9'}},
+        {'timestamp': 1518440880, 'data': {'price': '4.0'}}])
+
+    # when
+    prices = get_price_feed_arrays("http://localhost:8080/price", 1518440700, 1518440880)
+    vwaps = get_approx_vwaps(prices, 2)
+
+    # then
+    assert prices.volume.tolist() == [1.0, 1.0, 1.0]
+    assert np.allclose(vwaps, [1.5, 2.0, 4.0])
+
+
+def test_rolling_vwaps_loop_matches_numpy():
+    # given
+    prices = np.array([1.0, 2.0, 0.0, 4.0, 0.0, 0.0, 3.0])
+    volumes = np.array([10.0, 30.0, 0.0, 10.0, 0.0, 0.0, 5.0])
+
+    # when
+    vwaps_loop = rolling_vwaps_loop(prices, volumes, 2)
+    vwaps_numpy = rolling_vwaps_numpy(prices, volumes, 2)
+
+    # then
+    assert np.allclose(vwaps_loop, vwaps_numpy, equal_nan=True)
+    assert np.isnan(vwaps_loop[4])
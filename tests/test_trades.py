@@ -0,0 +1,107 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2017-2018 reverendus
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+from collections import namedtuple
+
+import pytest
+from texttable import Texttable
+
+import market_maker_stats.trades
+from market_maker_stats.trades import json_item, draw_table, text_trades
+
+
+FakeTrade = namedtuple('FakeTrade', 'timestamp exchange maker pair is_sell price amount money taker')
+
+
+def texttable(header: list, rows: list, cols_align: list) -> str:
+    table = Texttable(max_width=250)
+    table.set_deco(Texttable.HEADER)
+    table.set_cols_dtype(['t'] * len(header))
+    table.set_cols_align(cols_align)
+    table.add_rows([header] + rows)
+    return table.draw()
+
+
+def test_json_item_matches_indented_json():
+    # given
+    items = [{'exchange': '0x', 'pair': 'WETH-DAI', 'timestamp': 1500000000, 'price': 912.35, 'maker': None},
+             {'exchange': 'a},\n  {"b', 'pair': 'ÄÖÜ', 'timestamp': 0, 'price': 1e-10, 'maker': '0x00'}]
+
+    # when
+    result = '[\n' + ',\n'.join(map(json_item, items)) + '\n]'
+
+    # then
+    assert result == json.dumps(items, indent=True)
+
+
+def test_draw_table_matches_texttable(monkeypatch):
+    # given
+    header = ["Date/time", "Pair", "Type", "Price", "Amount"]
+    rows = [["2018-01-01 00:00:00 UTC", "WETH-DAI", "Sell", "912.35000000", "     1.50000000 WETH"],
+            ["2018-01-01 00:01:00 UTC", "WETH-DAI", "Buy", "12.10000000", "     10.00000000 WETH"],
+            ["2018-01-01 00:02:00 UTC", "-", "n/a", "0.00000001", "     0.00000000 WETH"]]
+    cols_align = ['l', 'c', 'c', 'r', 'r']
+
+    # when
+    monkeypatch.setattr(market_maker_stats.trades, 'FAST_TABLE_MIN_ROWS', 0)
+
+    # then
+    assert draw_table(header, rows, cols_align) == texttable(header, rows, cols_align)
+
+
+@pytest.mark.parametrize("cell", ["WETH-DAI   ", "   ", "", "WETH-DAI\nMKR", "WETH\tDAI", "ÄÖÜ", "中文"])
+@pytest.mark.parametrize("align", ['l', 'r', 'c'])
+def test_draw_table_matches_texttable_for_unusual_cells(monkeypatch, cell, align):
+    # given
+    header = ["Date/time", "Pair ", "Type", "Exchange"]
+    rows = [["2018-01-01 00:00:00 UTC", "WETH-DAI", "Sell", "0x"],
+            ["2018-01-01 00:01:00 UTC", cell, "Buy  ", "oasis"],
+            ["2018-01-01 00:02:00 UTC", "MKR-DAI", "Sell", "gdax"]]
+    cols_align = ['l', align, 'c', 'c']
+
+    # when
+    monkeypatch.setattr(market_maker_stats.trades, 'FAST_TABLE_MIN_ROWS', 0)
+
+    # then
+    assert draw_table(header, rows, cols_align) == texttable(header, rows, cols_align)
+
+
+def test_text_trades_matches_texttable(monkeypatch, tmpdir):
+    # given
+    trades = [FakeTrade(timestamp=1514764800 + 37 * index,
+                        exchange="0x",
+                        maker="0x" + format(index % 7, '040x'),
+                        pair="WETH-DAI",
+                        is_sell=[True, False, None][index % 3],
+                        price=700 + index / 17,
+                        amount=index / 3,
+                        money=(700 + index / 17) * index / 3,
+                        taker="0x" + format(index * 7919, '040x')) for index in range(600)]
+
+    def table(path) -> str:
+        return path.read().split("\n\nNumber of trades")[0]
+
+    # when
+    text_trades("DAI", "WETH", trades, str(tmpdir.join("fast.txt")), include_taker=True)
+
+    # and
+    monkeypatch.setattr(market_maker_stats.trades, 'FAST_TABLE_MIN_ROWS', len(trades) + 1)
+    text_trades("DAI", "WETH", trades, str(tmpdir.join("texttable.txt")), include_taker=True)
+
+    # then
+    assert table(tmpdir.join("fast.txt")) == table(tmpdir.join("texttable.txt"))
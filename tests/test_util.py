@@ -0,0 +1,277 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2017-2018 reverendus
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import argparse
+import json
+
+import pytest
+from web3 import Web3, HTTPProvider
+
+import market_maker_stats.util
+from market_maker_stats.util import to_seconds, sort_trades, sort_trades_for_pnl, gdax_backoff, gdax_fetch, gdax_session, \
+    get_block_timestamps, get_event_timestamp, prefetch_event_timestamps, positive_int, \
+    GDAX_MAX_BACKOFF, GDAX_MAX_RETRIES, JSON_RPC_BATCH_SIZE, BLOCK_CONFIRMATIONS
+
+
+class FakeTrade:
+    def __init__(self, timestamp: int, name: str):
+        self.timestamp = timestamp
+        self.name = name
+
+
+def test_to_seconds():
+    assert to_seconds("45s") == 45
+    assert to_seconds("5m") == 300
+    assert to_seconds("3h") == 10800
+    assert to_seconds("3d") == 259200
+    assert to_seconds("2w") == 1209600
+
+
+def test_to_seconds_fails_on_invalid_input():
+    with pytest.raises(ValueError):
+        to_seconds("3")
+
+    with pytest.raises(ValueError):
+        to_seconds("3y")
+
+    with pytest.raises(ValueError):
+        to_seconds("d")
+
+
+def test_positive_int():
+    assert positive_int("1") == 1
+    assert positive_int("10000") == 10000
+
+
+def test_positive_int_fails_on_invalid_input():
+    with pytest.raises(argparse.ArgumentTypeError):
+        positive_int("0")
+
+    with pytest.raises(argparse.ArgumentTypeError):
+        positive_int("-5")
+
+    with pytest.raises(ValueError):
+        positive_int("five")
+
+
+def test_sort_trades():
+    # given
+    trades = [FakeTrade(20, 'a'), FakeTrade(10, 'b'), FakeTrade(30, 'c'), FakeTrade(10, 'd')]
+
+    # expect
+    assert [trade.name for trade in sort_trades(trades)] == ['c', 'a', 'b', 'd']
+    assert [trade.name for trade in sort_trades_for_pnl(trades)] == ['b', 'd', 'a', 'c']
+
+
+def test_sort_trades_handles_empty_list():
+    assert sort_trades([]) == []
+    assert sort_trades_for_pnl([]) == []
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, content: bytes, headers: dict = None):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.reason = "Fake"
+        self.content = content
+        self.headers = headers or {}
+
+
+@pytest.fixture
+def gdax(mocker):
+    mocker.patch.object(market_maker_stats.util.gdax_rate_limiter, 'acquire')
+    sleep = mocker.patch('market_maker_stats.util.time.sleep')
+    get = mocker.patch.object(market_maker_stats.util.gdax_session, 'get')
+    return get, sleep
+
+
+def test_gdax_backoff_grows_exponentially_up_to_the_cap():
+    assert gdax_backoff(0) == 2
+    assert gdax_backoff(1) == 4
+    assert gdax_backoff(4) == 32
+    assert gdax_backoff(5) == GDAX_MAX_BACKOFF
+    assert gdax_backoff(9) == GDAX_MAX_BACKOFF
+
+
+def test_gdax_backoff_honors_retry_after():
+    assert gdax_backoff(0, "7") == 7
+    assert gdax_backoff(3, "1.5") == 1.5
+    assert gdax_backoff(0, "3600") == GDAX_MAX_BACKOFF
+    assert gdax_backoff(1, "invalid") == 4
+
+
+def test_gdax_fetch_returns_candles(gdax):
+    # given
+    get, sleep = gdax
+    get.return_value = FakeResponse(200, b'[[1500000000, 1, 2, 1, 2, 10]]')
+
+    # when
+    data = gdax_fetch("https://api.gdax.com/products/ETH-USD/candles")
+
+    # then
+    assert data == [[1500000000, 1, 2, 1, 2, 10]]
+    assert get.call_count == 1
+    assert sleep.call_count == 0
+
+
+def test_gdax_fetch_retries_on_rate_limiting_and_errors(gdax):
+    # given
+    get, sleep = gdax
+    get.side_effect = [FakeResponse(429, b'{"message": "Slow down"}', {'Retry-After': '5'}),
+                       FakeResponse(200, b'{"message": "Rate limit exceeded"}'),
+                       FakeResponse(200, b'42'),
+                       FakeResponse(502, b'<html>Bad Gateway</html>'),
+                       FakeResponse(200, b'[]')]
+
+    # when
+    data = gdax_fetch("https://api.gdax.com/products/ETH-USD/candles")
+
+    # then
+    assert data == []
+    assert get.call_count == 5
+    assert [call[0][0] for call in sleep.call_args_list] == [5, 4, 8, 16]
+
+
+def test_gdax_fetch_gives_up_after_max_retries(gdax):
+    # given
+    get, sleep = gdax
+    get.return_value = FakeResponse(429, b'{"message": "Slow down"}')
+
+    # expect
+    with pytest.raises(Exception, match="Unable to fetch data from GDAX API"):
+        gdax_fetch("https://api.gdax.com/products/ETH-USD/candles")
+
+    # and
+    assert get.call_count == GDAX_MAX_RETRIES
+    assert max(call[0][0] for call in sleep.call_args_list) == GDAX_MAX_BACKOFF
+
+
+def test_gdax_session_leaves_retries_to_gdax_fetch():
+    # expect
+    assert gdax_session.get_adapter("https://api.gdax.com/").max_retries.total == 0
+
+
+class FakeJsonRpcNode:
+    def __init__(self):
+        self.batches = []
+
+    def post(self, url, **kwargs):
+        calls = kwargs['json']
+        self.batches.append([call['id'] for call in calls])
+        return FakeResponse(200, json.dumps([{"jsonrpc": "2.0", "id": call['id'], "result": {"timestamp": hex(1500000000 + int(call['params'][0], 16))}}
+                                             for call in calls]).encode())
+
+
+@pytest.fixture
+def infura(mocker, tmpdir):
+    mocker.patch('market_maker_stats.util.cache_folder', return_value=str(tmpdir))
+
+    node = FakeJsonRpcNode()
+    mocker.patch.object(market_maker_stats.util.json_rpc_session, 'post', side_effect=node.post)
+
+    infura = Web3(HTTPProvider("https://mainnet.infura.io/"))
+    mocker.patch.object(infura, 'eth')
+    infura.eth.blockNumber = 10000
+    return infura, node
+
+
+def test_get_block_timestamps_fetches_blocks_in_batches(infura):
+    # given
+    infura, node = infura
+    block_numbers = list(range(1000, 1000 + 2 * JSON_RPC_BATCH_SIZE + 50)) + [1000, 1001]
+
+    # when
+    result = get_block_timestamps(infura, block_numbers)
+
+    # then
+    assert [len(batch) for batch in node.batches] == [JSON_RPC_BATCH_SIZE, JSON_RPC_BATCH_SIZE, 50]
+    assert sorted(sum(node.batches, [])) == sorted(set(block_numbers))
+
+    # and
+    assert len(result) == 2 * JSON_RPC_BATCH_SIZE + 50
+    assert all(result[block_number] == 1500000000 + block_number for block_number in block_numbers)
+
+
+def test_get_block_timestamps_caches_only_final_blocks(infura):
+    # given
+    infura, node = infura
+    block_numbers = list(range(10000 - 20, 10000 + 1))
+
+    # when
+    first_result = get_block_timestamps(infura, block_numbers)
+    second_result = get_block_timestamps(infura, block_numbers)
+
+    # then
+    assert first_result == second_result
+    assert node.batches[0] == block_numbers
+    assert node.batches[1] == list(range(10000 - BLOCK_CONFIRMATIONS + 1, 10000 + 1))
+
+
+def test_get_block_timestamps_fails_on_rejected_batch(infura, mocker):
+    # given
+    infura, node = infura
+    mocker.patch.object(market_maker_stats.util.json_rpc_session, 'post',
+                        return_value=FakeResponse(200, b'{"jsonrpc": "2.0", "id": null, "error": {"code": -32005, "message": "rate limited"}}'))
+
+    # expect
+    with pytest.raises(Exception, match="Unable to fetch block timestamps"):
+        get_block_timestamps(infura, [1, 2, 3])
+
+
+def test_get_block_timestamps_fails_on_missing_block(infura, mocker):
+    # given
+    infura, node = infura
+    mocker.patch.object(market_maker_stats.util.json_rpc_session, 'post',
+                        return_value=FakeResponse(200, b'[{"jsonrpc": "2.0", "id": 1, "result": null}]'))
+
+    # expect
+    with pytest.raises(Exception, match="Unable to fetch timestamp of block #1"):
+        get_block_timestamps(infura, [1])
+
+
+class FakeEvent:
+    def __init__(self, block_hash: str):
+        self.raw = {'blockHash': block_hash}
+
+
+class FakeBlock:
+    def __init__(self, block_hash: str):
+        self.timestamp = 1500000000 + int(block_hash, 16)
+
+
+def test_prefetch_event_timestamps_uses_the_cache_in_bulk(infura, mocker):
+    # given
+    infura, node = infura
+    infura.eth.getBlock.side_effect = FakeBlock
+    mocker.patch.dict(market_maker_stats.util.block_hash_timestamps, clear=True)
+    events = [FakeEvent(hex(block_number)) for block_number in range(1500)] * 2
+
+    # when
+    prefetch_event_timestamps(infura, events)
+
+    # then
+    assert infura.eth.getBlock.call_count == 1500
+    assert all(get_event_timestamp(infura, event) == 1500000000 + int(event.raw['blockHash'], 16) for event in events)
+    assert infura.eth.getBlock.call_count == 1500
+
+    # when
+    market_maker_stats.util.block_hash_timestamps.clear()
+    prefetch_event_timestamps(infura, events + [FakeEvent(hex(1500))])
+
+    # then
+    assert infura.eth.getBlock.call_count == 1501
+    assert all(get_event_timestamp(infura, event) == 1500000000 + int(event.raw['blockHash'], 16) for event in events)
@@ -0,0 +1,82 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2017-2018 reverendus
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+from pymaker.zrx import ZrxExchange
+
+from market_maker_stats.zrx import zrx_past_fills
+
+
+class FakeLogFill:
+    def __init__(self, log: dict):
+        self.raw = log
+
+
+class FakePastEvents:
+    def __init__(self, logs: list):
+        self.logs = logs
+
+    def get(self, only_changes: bool):
+        return self.logs
+
+
+class FakeContract:
+    def __init__(self, logs: list):
+        self.logs = logs
+        self.queries = []
+
+    def pastEvents(self, event_name: str, filter_params: dict):
+        assert event_name == 'LogFill'
+        self.queries.append(filter_params)
+
+        # we return logs of each chunk in reverse order, to check that they get sorted
+        return FakePastEvents([log for log in reversed(self.logs)
+                               if filter_params['fromBlock'] <= log['blockNumber'] <= filter_params['toBlock']])
+
+
+@pytest.fixture
+def exchange(mocker):
+    mocker.patch('market_maker_stats.zrx.LogFill', FakeLogFill)
+
+    logs = [{'blockNumber': block_number, 'logIndex': log_index} for block_number in range(0, 1000, 7) for log_index in (0, 1)]
+    exchange = mocker.MagicMock(spec=ZrxExchange)
+    exchange._contract = FakeContract(logs)
+    return exchange
+
+
+def test_zrx_past_fills_splits_range_into_chunks(exchange):
+    # when
+    past_fills = zrx_past_fills(exchange, 990, 500, {'maker': '0x00'}, 100, 4)
+
+    # then
+    assert sorted((query['fromBlock'], query['toBlock']) for query in exchange._contract.queries) == \
+           [(490, 589), (590, 689), (690, 789), (790, 889), (890, 989), (990, 990)]
+    assert all(query['filter'] == {'maker': '0x00'} for query in exchange._contract.queries)
+
+    # and
+    assert [(log_fill.raw['blockNumber'], log_fill.raw['logIndex']) for log_fill in past_fills] == \
+           [(log['blockNumber'], log['logIndex']) for log in exchange._contract.logs if 490 <= log['blockNumber'] <= 990]
+
+
+def test_zrx_past_fills_does_not_go_below_genesis(exchange):
+    # when
+    past_fills = zrx_past_fills(exchange, 150, 1000, {'maker': '0x00'}, 100, 4)
+
+    # then
+    assert sorted((query['fromBlock'], query['toBlock']) for query in exchange._contract.queries) == [(0, 99), (100, 150)]
+    assert past_fills[0].raw['blockNumber'] == 0
+    assert past_fills[-1].raw['blockNumber'] == 147